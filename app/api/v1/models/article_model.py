@@ -1,4 +1,15 @@
 from app.database.mongodb import get_database
+from app.services.article_index import index_articles
+from app.services.article_vectors import vectorize_articles
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import List, Dict
+import asyncio
+import hashlib
+import time
+
+# Keep references to off-critical-path writes so they aren't garbage collected mid-flight
+_background_saves = set()
 
 def get_articles_collection():
     db = get_database()
@@ -7,16 +18,122 @@ def get_articles_collection():
     return db["articles"]
 
 
+async def ensure_article_indexes():
+    collection = get_articles_collection()
+    try:
+        await collection.create_index("article_id", unique=True)
+        # Lets other workers' article indexes pick up new saves incrementally
+        await collection.create_index("saved_at")
+    except Exception as e:
+        print(f"[!] Could not create articles indexes: {e}")
+
+
+def compute_content_hash(article: dict) -> str:
+    """Hash of the GNews fields that drive enrichment (changes when the story is edited)"""
+    raw = "\x1f".join([
+        article.get("title") or "",
+        article.get("description") or "",
+        article.get("content") or "",
+    ])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
 async def save_article(article: dict):
     collection = get_articles_collection()
+    doc = {**article, "saved_at": time.time()}
     await collection.update_one(
         {"article_id": article["article_id"]},
-        {"$set": article},
+        {"$set": doc},
         upsert=True
     )
+    index_articles([doc])
+    await vectorize_articles([doc])
     return article
 
 
+async def _bulk_upsert_articles(articles: List[dict]) -> int:
+    # One op per article_id (last write wins) so unordered upserts can't race each other
+    now = time.time()
+    unique = {article["article_id"]: {**article, "saved_at": now} for article in articles}
+    docs = list(unique.values())
+
+    operations = [
+        UpdateOne({"article_id": doc["article_id"]}, {"$set": doc}, upsert=True)
+        for doc in docs
+    ]
+
+    collection = get_articles_collection()
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        index_articles(docs)
+        await vectorize_articles(docs)
+        return result.upserted_count + result.modified_count
+    except BulkWriteError as e:
+        # Unordered: everything except the failed ops was still written
+        failed_indexes = set()
+        for error in e.details.get("writeErrors", []):
+            failed_indexes.add(error["index"])
+            failed = docs[error["index"]]
+            print(f"Error saving article {failed.get('url')}: {error.get('errmsg')}")
+        written = [doc for i, doc in enumerate(docs) if i not in failed_indexes]
+        index_articles(written)
+        await vectorize_articles(written)
+        return e.details.get("nUpserted", 0) + e.details.get("nModified", 0)
+    except Exception as e:
+        print(f"Bulk article save failed ({len(docs)} docs): {e}")
+        return 0
+
+
+async def save_articles_bulk(articles: List[dict], background: bool = False):
+    """
+    Upsert many articles with a single unordered bulk_write.
+    With background=True the write is scheduled off the critical path and None is returned.
+    """
+    if not articles:
+        return 0
+
+    if not background:
+        return await _bulk_upsert_articles(articles)
+
+    task = asyncio.create_task(_bulk_upsert_articles(articles))
+    _background_saves.add(task)
+    task.add_done_callback(_background_saves.discard)
+    return None
+
+
+async def flush_background_saves():
+    """Wait for scheduled article writes (called on shutdown)"""
+    if _background_saves:
+        await asyncio.gather(*list(_background_saves), return_exceptions=True)
+
+
 async def get_article(article_id: str):
     collection = get_articles_collection()
     return await collection.find_one({"article_id": article_id})
+
+
+async def get_enriched_articles(articles: List[dict]) -> Dict[str, dict]:
+    """
+    Batch lookup of already enriched articles for a list of raw GNews results.
+    Returns {article_id: stored_doc} for every URL whose stored content hash
+    still matches, resolved with a single $in query.
+    """
+    hashes = {
+        article["url"]: compute_content_hash(article)
+        for article in articles
+        if article.get("url")
+    }
+    if not hashes:
+        return {}
+
+    collection = get_articles_collection()
+    docs = await collection.find(
+        {"article_id": {"$in": list(hashes)}, "content_hash": {"$exists": True}},
+        {"_id": 0, "article_id": 1, "content_hash": 1, "summary": 1, "keywords": 1, "has_full_content": 1},
+    ).to_list(length=len(hashes))
+
+    return {
+        doc["article_id"]: doc
+        for doc in docs
+        if doc.get("content_hash") == hashes.get(doc["article_id"])
+    }
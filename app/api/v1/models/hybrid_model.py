@@ -1,41 +1,181 @@
 from app.api.v1.models.interaction_model import get_user_profile
-from app.api.v1.models.collab_model import collab_recommend_articles
-from app.database.redis_client import redis_client
+from app.api.v1.models.item_model import item_recommend_articles
+from app.database.redis_client import redis_client, pipeline_ops
 from app.core.config import settings
-import requests
+from app.services import gnews_client
+from app.services.gnews_client import GNewsError
+from app.services.article_index import get_article_index
+from app.services.article_vectors import rank_articles_many, vectors_ready
+from app.database.mongodb import get_database
+from app.services.keyword_matcher import get_profile_matcher
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
 import json
 
 CONTENT_WEIGHT = 0.6
 COLLAB_WEIGHT = 0.4
 KEYWORD_FACTOR = 3
 
+HYBRID_RANK_PREFIX = "hybrid_rank:"
+HYBRID_DOCS_PREFIX = "hybrid_docs:"
+HYBRID_CACHE_TTL = 600  # 10 min
+HYBRID_MAX_RESULTS = 100
 
-async def compute_content_scores(user_id: str):
-    profile = await get_user_profile(user_id)
+
+async def compute_content_scores(user_id: str, profile: Optional[dict] = None, topic_articles: Optional[Dict[str, dict]] = None):
+    """
+    Content candidates for a user. `profile` and `topic_articles` ({topic: GNews search
+    response}) can be passed in by batch jobs that load them in bulk.
+    """
+    if profile is None:
+        profile = await get_user_profile(user_id)
     if not profile or not profile.get("topics"):
         return None
+    return (await compute_group_content_scores({user_id: profile}, topic_articles))[user_id]
+
+
+async def compute_group_content_scores(profiles: Dict[str, dict], topic_articles: Optional[Dict[str, dict]] = None):
+    """
+    Content candidates for several users at once ({user_id: results or None}).
+    Vector ranking scores the whole group in one matrix product and hydrates the
+    union of their articles with one query; the other paths run per profile.
+    """
+    results: Dict[str, Optional[dict]] = {user_id: None for user_id in profiles}
+    pending = [user_id for user_id, profile in profiles.items() if profile and profile.get("topics")]
+
+    # Rank every stored article against the profile vectors. Until this host's
+    # matrix is backfilled it only covers new articles, so BM25 answers instead.
+    if pending and vectors_ready():
+        ranked = await rank_articles_many(
+            [(profiles[user_id]["topics"], profiles[user_id].get("keywords", {})) for user_id in pending],
+            settings.ARTICLE_INDEX_RESULTS,
+        )
+        articles = await _hydrate_articles(list({article_id for user_ranked in ranked for article_id, _ in user_ranked}))
+        for user_id, user_ranked in zip(pending, ranked):
+            scored = {
+                articles[article_id]["url"]: {"article": articles[article_id], "content_score": round(score, 4)}
+                for article_id, score in user_ranked
+                if article_id in articles and articles[article_id].get("url")
+            }
+            if scored:
+                results[user_id] = scored
+        pending = [user_id for user_id in pending if results[user_id] is None]
+
+    # Score the whole profile against the keyword/topic index (local, no external call).
+    # Stays on the event loop: the sync task mutates the index there.
+    index = get_article_index()
+    if index is not None:
+        for user_id in pending:
+            profile = profiles[user_id]
+            hits = index.search(profile["topics"], profile.get("keywords", {}), settings.ARTICLE_INDEX_RESULTS)
+            if hits:
+                results[user_id] = {
+                    article["url"]: {"article": article, "content_score": round(score, 4)}
+                    for article, score, _ in hits
+                }
+        pending = [user_id for user_id in pending if results[user_id] is None]
+
+    for user_id in pending:
+        results[user_id] = await _gnews_content_scores(profiles[user_id], topic_articles)
+    return results
+
+
+async def _hydrate_articles(article_ids: List[str]) -> Dict[str, dict]:
+    """Article records from the in-process index, with one $in query for any it lacks"""
+    index = get_article_index()
+    found = {}
+    if index is not None:
+        for article_id in article_ids:
+            article = index.get(article_id)
+            if article is not None:
+                found[article_id] = article
+
+    missing = [article_id for article_id in article_ids if article_id not in found]
+    if missing:
+        docs = await get_database()["articles"].find(
+            {"article_id": {"$in": missing}},
+            {"_id": 0, "content_hash": 0},
+        ).to_list(length=len(missing))
+        found.update({doc["article_id"]: doc for doc in docs})
+    return found
 
-    # Pick highest scored topic
-    sorted_topics = sorted(profile["topics"].items(), key=lambda x: x[1], reverse=True)
-    top_topic, top_score = sorted_topics[0]
 
-    url = f"https://gnews.io/api/v4/search?q={top_topic}&lang=en&country=in&max=10&apikey={settings.NEWS_API_KEY}"
-    response = requests.get(url).json()
+def top_topics(profile: dict, n: int) -> List[Tuple[str, float]]:
+    """Highest scored topics, best first (positive ones only unless none are)"""
+    ranked = sorted(profile["topics"].items(), key=lambda x: x[1], reverse=True)
+    positive = [item for item in ranked if item[1] > 0]
+    return (positive or ranked)[:max(n, 1)]
 
-    if "articles" not in response:
+
+async def fetch_topic_candidates(profile: dict, prefetched: Optional[Dict[str, dict]] = None) -> List[Tuple[dict, str, float]]:
+    """
+    GNews candidates for the profile's top topics, searched concurrently within
+    CONTENT_FETCH_DEADLINE_SECONDS. Returns (article, topic, topic_score) deduped by URL,
+    each article credited to its highest scored topic. Topics that miss the deadline are dropped.
+    """
+    fanout = settings.CONTENT_TOPIC_FANOUT
+    remaining = await gnews_client.remaining_daily_quota()
+    if remaining is not None and remaining < settings.CONTENT_FANOUT_MIN_QUOTA:
+        # Protect the shared daily quota - only the top topic
+        fanout = 1
+
+    topics = top_topics(profile, fanout)
+    prefetched = prefetched or {}
+
+    async def _search(topic):
+        try:
+            return await gnews_client.search(topic, country="in", max_results=10)
+        except GNewsError as e:
+            print(f"GNews search failed for '{topic}': {e}")
+            return None
+
+    tasks = {
+        topic: asyncio.create_task(_search(topic))
+        for topic, _ in topics
+        if topic not in prefetched
+    }
+    responses = dict(prefetched)
+    if tasks:
+        # Total budget is one deadline for all topics, not one per topic
+        _, pending = await asyncio.wait(tasks.values(), timeout=settings.CONTENT_FETCH_DEADLINE_SECONDS)
+        for task in pending:
+            task.cancel()
+        for topic, task in tasks.items():
+            if task.done() and not task.cancelled():
+                responses[topic] = task.result()
+
+    candidates = []
+    seen = set()
+    for topic, topic_score in topics:
+        response = responses.get(topic) or {}
+        for article in response.get("articles", []):
+            url = article.get("url")
+            if url and url not in seen:
+                seen.add(url)
+                candidates.append((article, topic, topic_score))
+    return candidates
+
+
+async def _gnews_content_scores(profile: dict, topic_articles: Optional[Dict[str, dict]] = None):
+    """Fallback when the local index has nothing: live GNews search over the top topics"""
+    candidates = await fetch_topic_candidates(profile, topic_articles)
+    if not candidates:
         return None
 
-    user_keywords = profile.get("keywords", {})
+    # One pass over each text regardless of how many keywords the profile has
+    matcher = get_profile_matcher(profile.get("user_id"), profile.get("keywords", {}))
 
     ranked_articles = {}
 
-    for article in response["articles"]:
-        text = (article.get("title", "") + " " + article.get("description", "")).lower()
+    for article, topic, topic_score in candidates:
+        text = article.get("title", "") + " " + article.get("description", "")
 
-        keyword_matches = [kw for kw in user_keywords.keys() if kw.lower() in text]
+        keyword_matches = list(matcher.find(text))
         keyword_score = len(keyword_matches) * KEYWORD_FACTOR
 
-        final_score = top_score + keyword_score
+        # Each article carries the weight of the topic it was found under
+        final_score = topic_score + keyword_score
 
         ranked_articles[article["url"]] = {
             "article": article,
@@ -45,20 +185,8 @@ async def compute_content_scores(user_id: str):
     return ranked_articles
 
 
-async def hybrid_recommend(user_id: str):
-
-    cache_key = f"hybrid_rec:{user_id}"
-
-    # ------------------ Check Cache First ------------------
-    cached = redis_client.get(cache_key)
-    if cached:
-        print("⚡ Served from Redis Cache")
-        return json.loads(cached)
-
-    # ------------------ Compute Fresh Recommendation ------------------
-    content_results = await compute_content_scores(user_id)
-    collab_results = await collab_recommend_articles(user_id)
-
+def blend_recommendations(content_results, collab_results) -> Optional[List[dict]]:
+    """Weighted merge of content and collaborative candidates, top HYBRID_MAX_RESULTS best first"""
     if not content_results and not collab_results:
         return None
 
@@ -89,16 +217,93 @@ async def hybrid_recommend(user_id: str):
             else:
                 final_scores[url]["score"] += collab_score * COLLAB_WEIGHT
 
-    # Sort recommendations
-    sorted_recommendations = sorted(
-        final_scores.values(),
-        key=lambda x: x["score"],
-        reverse=True
-    )
+    # Heap-based top-k instead of sorting every candidate
+    return heapq.nlargest(HYBRID_MAX_RESULTS, final_scores.values(), key=lambda x: x["score"])
+
+
+async def compute_hybrid(user_id: str, profile: Optional[dict] = None, topic_articles: Optional[Dict[str, dict]] = None):
+    """Fresh (uncached) hybrid recommendation"""
+    content_results = await compute_content_scores(user_id, profile, topic_articles)
+    collab_results = await item_recommend_articles(user_id)
+    return blend_recommendations(content_results, collab_results)
+
+
+# -------------------- Ranked list cache --------------------
+# hybrid_rank:{user_id}  ZSET  member = article id, score = hybrid score
+# hybrid_docs:{user_id}  HASH  article id -> JSON body, only for candidates that are
+#                              not stored articles (raw GNews results)
+def ranking_keys(user_id: str) -> Tuple[str, str]:
+    return f"{HYBRID_RANK_PREFIX}{user_id}", f"{HYBRID_DOCS_PREFIX}{user_id}"
+
+
+def _item_id(article: dict) -> str:
+    return article.get("article_id") or article.get("url")
+
+
+def ranking_ops(user_id: str, recommendations: List[dict]) -> List[tuple]:
+    """Redis ops replacing a user's cached ranking (for pipelined writes)"""
+    rank_key, docs_key = ranking_keys(user_id)
+    ops = [("delete", rank_key, docs_key)]
+
+    scores = {}
+    for item in recommendations:
+        article = item["article"]
+        item_id = _item_id(article)
+        if not item_id or item_id in scores:
+            continue
+        scores[item_id] = item["score"]
+        if not article.get("article_id"):
+            ops.append(("hset", docs_key, item_id, json.dumps(article)))
+
+    if scores:
+        ops.append(("zadd", rank_key, scores))
+        ops.append(("expire", rank_key, HYBRID_CACHE_TTL))
+        ops.append(("expire", docs_key, HYBRID_CACHE_TTL))
+    return ops
 
-    # ------------------ Store in Redis Cache (10min) ------------------
-    redis_client.setex(cache_key, 600, json.dumps(sorted_recommendations))  # 600 sec = 10 min
 
-    print("📝 Stored hybrid recommendation in cache")
+async def store_ranking(user_id: str, recommendations: List[dict]):
+    await pipeline_ops(ranking_ops(user_id, recommendations))
+
+
+async def get_cached_page(user_id: str, offset: int, limit: int) -> Optional[Tuple[List[dict], int]]:
+    """
+    One page of the cached ranking as ([{"article", "score"}], total), or None on a miss.
+    Only the page's articles are hydrated.
+    """
+    rank_key, docs_key = ranking_keys(user_id)
+    pairs, total = await pipeline_ops([
+        ("zrevrange", rank_key, offset, offset + limit - 1, True),
+        ("zcard", rank_key),
+    ])
+    if not total:
+        return None
+    if not pairs:
+        return [], total
+
+    ids = [item_id for item_id, _ in pairs]
+    bodies = await redis_client.hmget(docs_key, ids)
+    articles = {item_id: json.loads(body) for item_id, body in zip(ids, bodies) if body}
+
+    missing = [item_id for item_id in ids if item_id not in articles]
+    if missing:
+        articles.update(await _hydrate_articles(missing))
+
+    page = [
+        {"article": articles[item_id], "score": score}
+        for item_id, score in pairs
+        if item_id in articles
+    ]
+    return page, total
+
+
+async def hybrid_recommend(user_id: str) -> Optional[List[dict]]:
+    """Compute a fresh ranking and cache it as (article id, score) pairs"""
+    recommendations = await compute_hybrid(user_id)
+    if not recommendations:
+        return None
+
+    await store_ranking(user_id, recommendations)
+    print("📝 Stored hybrid ranking in cache")
 
-    return sorted_recommendations
+    return recommendations
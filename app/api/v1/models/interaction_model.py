@@ -1,6 +1,14 @@
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Dict, List, Optional, Tuple
 from app.database.mongodb import get_database
-from app.database.redis_client import redis_client
+from app.database.redis_client import delete_many
+from app.services.collab_engine import update_collab_user
+from app.services.keyword_matcher import invalidate_profile_matcher
+from app.services.profile_compaction import decay_profile, compaction_due, schedule_compaction, compact_if_due
+from app.utils.profile_keys import encode_key, decode_profile
+import time
 
 
 def get_interactions_collection():
@@ -11,6 +19,11 @@ def get_profiles_collection():
     return get_database()["profiles"]
 
 
+DUPLICATE_KEY_ERROR = 11000
+
+# Ids of the last write-behind batches folded into each profile (makes retries idempotent)
+APPLIED_BATCHES_KEPT = 20
+
 # Weighted behavior scoring system
 SCORE_WEIGHTS = {
     "view": 1,
@@ -20,7 +33,34 @@ SCORE_WEIGHTS = {
 }
 
 
-async def record_interaction(data: dict):
+def profile_increments(topic: str, keywords: List[str], score_change: float, inc: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Accumulate one interaction into a profile "$inc" document
+    ({"topics.<topic>": n, "keywords.<kw>": n}, field names encoded).
+    """
+    inc = {} if inc is None else inc
+    if topic:
+        path = f"topics.{encode_key(topic)}"
+        inc[path] = inc.get(path, 0) + score_change
+    for kw in keywords:
+        if kw:
+            path = f"keywords.{encode_key(kw)}"
+            inc[path] = inc.get(path, 0) + score_change
+    return inc
+
+
+def profile_update(inc: Dict[str, float]) -> dict:
+    """
+    Upsert document for a profile's increments. `version` and `pending_keys` let the
+    compaction (decay + prune) detect concurrent writes and know when it is due.
+    """
+    return {
+        "$inc": {**inc, "version": 1, "pending_keys": len(inc)},
+        "$setOnInsert": {"decayed_at": time.time()},
+    }
+
+
+async def record_interaction(data: dict, return_profile: bool = False):
 
     interactions = get_interactions_collection()
     profiles = get_profiles_collection()
@@ -36,34 +76,36 @@ async def record_interaction(data: dict):
 
     score_change = SCORE_WEIGHTS.get(interaction_type, 1)
 
-    # Fetch existing profile
-    profile = await profiles.find_one({"user_id": user_id})
+    # Atomic in-place increments - one round trip, no lost updates between concurrent
+    # interactions, and the write size doesn't depend on how big the profile is
+    update = profile_update(profile_increments(topic, keywords, score_change))
 
-    # If new user - create empty preference structure
-    if not profile:
-        profile = {
-            "user_id": user_id,
-            "topics": {},
-            "keywords": {}
-        }
+    # Without return_profile only the compaction bookkeeping is read back
+    projection = None if return_profile else {"_id": 0, "decayed_at": 1, "pending_keys": 1}
+    written = await profiles.find_one_and_update(
+        {"user_id": user_id}, update, projection=projection, upsert=True, return_document=ReturnDocument.AFTER
+    )
 
-    # Update score for topic
-    profile["topics"][topic] = profile["topics"].get(topic, 0) + score_change
+    profile = None
+    if return_profile:
+        profile = decay_profile(decode_profile(written))
+        if "_id" in profile:
+            profile["_id"] = str(profile["_id"])
+    elif compaction_due(written, time.time()):
+        schedule_compaction([user_id])
 
-    # Update keyword weights
+    # ----------------- UPDATE SIMILARITY INCREMENTALLY -----------------
+    # Only this user's row and the neighbor lists it enters/leaves are touched
+    keyword_deltas = {}
     for kw in keywords:
-        profile["keywords"][kw] = profile["keywords"].get(kw, 0) + score_change
+        keyword_deltas[kw] = keyword_deltas.get(kw, 0) + score_change
+    update_collab_user(user_id, keyword_deltas)
 
-    # Save profile changes
-    await profiles.update_one({"user_id": user_id}, {"$set": profile}, upsert=True)
-
-    # Remove ObjectId -> convert to string if exists
-    if "_id" in profile:
-        profile["_id"] = str(profile["_id"])
+    # Keyword set changed - the compiled matcher is rebuilt on next use
+    invalidate_profile_matcher(user_id)
 
     # ----------------- CLEAR HYBRID CACHE -----------------
-    cache_key = f"hybrid_rec:{user_id}"
-    redis_client.delete(cache_key)
+    await delete_many([f"hybrid_rank:{user_id}", f"hybrid_docs:{user_id}"])
     print(f"🗑️ Cache cleared for user: {user_id} (hybrid recommendations invalidated)")
 
     # ------------------ Send response ----------------------
@@ -77,8 +119,112 @@ async def record_interaction(data: dict):
     }
 
 
+async def insert_interactions(events: List[dict]) -> List[Optional[str]]:
+    """
+    One unordered insert_many. Returns the insert error per event (None = stored).
+    insert_many assigns _id in place, so ids are known even when some inserts fail,
+    and re-inserting the same events after an error is idempotent: a duplicate _id
+    means that event was already stored by the earlier attempt.
+    """
+    errors: List[Optional[str]] = [None] * len(events)
+    try:
+        await get_interactions_collection().insert_many(events, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            if err.get("code") != DUPLICATE_KEY_ERROR:
+                errors[err["index"]] = err.get("errmsg", "insert failed")
+    return errors
+
+
+async def apply_profile_deltas(events: List[dict], batch_id: Optional[str] = None):
+    """
+    Fold stored interactions into profiles: one bulk_write of per-user coalesced $inc
+    updates, then the live collab rows, keyword matchers and one pipelined cache invalidation.
+
+    With a `batch_id` the call can be retried safely after any error, including an
+    ambiguous one (timeout after the server committed): each update only matches a
+    profile that hasn't recorded the batch yet, so a repeat falls through to the upsert
+    and hits the unique user_id index instead of incrementing twice.
+    """
+    increments: Dict[str, Dict[str, float]] = {}
+    keyword_deltas: Dict[str, Dict[str, float]] = {}
+    for event in events:
+        user_id = event["user_id"]
+        keywords = event.get("keywords", [])
+        score_change = SCORE_WEIGHTS.get(event.get("interaction_type", "view"), 1)
+
+        profile_increments(event["topic"], keywords, score_change, increments.setdefault(user_id, {}))
+        deltas = keyword_deltas.setdefault(user_id, {})
+        for kw in keywords:
+            deltas[kw] = deltas.get(kw, 0) + score_change
+
+    updates, update_users = [], []
+    for user_id, inc in increments.items():
+        if not inc:
+            continue
+        query, update = {"user_id": user_id}, profile_update(inc)
+        if batch_id is not None:
+            query["applied_batches"] = {"$ne": batch_id}
+            update["$push"] = {"applied_batches": {"$each": [batch_id], "$slice": -APPLIED_BATCHES_KEPT}}
+        updates.append(UpdateOne(query, update, upsert=True))
+        update_users.append(user_id)
+    if not updates:
+        return
+
+    profiles = get_profiles_collection()
+    try:
+        await profiles.bulk_write(updates, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if batch_id is None or any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+            raise
+        # A duplicate key means the batch was applied by an earlier attempt - or that a
+        # concurrent upsert created the profile first. Only the former is done.
+        duplicates = [update_users[err["index"]] for err in errors]
+        applied = await profiles.count_documents({"user_id": {"$in": duplicates}, "applied_batches": batch_id})
+        if applied < len(duplicates):
+            raise
+
+    for user_id, deltas in keyword_deltas.items():
+        update_collab_user(user_id, deltas)
+        invalidate_profile_matcher(user_id)
+
+    # The increments are applied - a failure past this point must not make callers retry them
+    try:
+        await compact_if_due(increments)
+        await delete_many([key for user_id in increments for key in (f"hybrid_rank:{user_id}", f"hybrid_docs:{user_id}")])
+    except Exception as e:
+        print(f"Post-update maintenance failed for {len(increments)} profiles (cached rankings expire on their TTL): {e}")
+
+
+async def apply_interactions(events: List[dict]) -> Tuple[List[Tuple[Optional[str], Optional[str]]], Optional[str]]:
+    """
+    Persist a batch of interactions with bulk writes (insert_many, then the profile updates).
+    Returns ([(interaction_id, insert_error)] per event in order, profile_error).
+    A profile/cache failure doesn't undo the inserts, so it is reported separately.
+    """
+    if not events:
+        return [], None
+
+    errors = await insert_interactions(events)
+    results = [
+        (None, error) if error else (str(event["_id"]), None)
+        for event, error in zip(events, errors)
+    ]
+
+    profile_error = None
+    try:
+        await apply_profile_deltas([event for event, error in zip(events, errors) if error is None])
+    except Exception as e:
+        profile_error = str(e)
+        print(f"Profile update failed after storing {sum(1 for _, error in results if not error)} interactions: {e}")
+
+    return results, profile_error
+
+
 async def get_user_profile(user_id: str):
-    profile = await get_profiles_collection().find_one({"user_id": user_id})
+    # Decayed and pruned to the top-K on read; the stored copy is compacted lazily
+    profile = decay_profile(decode_profile(await get_profiles_collection().find_one({"user_id": user_id})))
 
     if profile and "_id" in profile:
         profile["_id"] = str(profile["_id"])
@@ -86,35 +232,75 @@ async def get_user_profile(user_id: str):
     return profile
 
 
-async def get_saved_articles(user_id: str):
-    """Fetch all articles saved by a user"""
+# Fields the saved-articles view renders
+SAVED_ARTICLE_FIELDS = {
+    "_id": 0, "article_id": 1, "title": 1, "url": 1, "summary": 1, "description": 1,
+    "source": 1, "topic": 1, "keywords": 1, "published_at": 1, "image": 1,
+}
+
+
+async def ensure_interaction_indexes():
+    try:
+        # Saved-articles pages: a user's saves, newest first, resumed from a cursor
+        await get_interactions_collection().create_index([("user_id", 1), ("interaction_type", 1), ("_id", -1)])
+    except Exception as e:
+        print(f"[!] Could not create interaction indexes: {e}")
+
+
+async def ensure_profile_indexes():
+    try:
+        # Every profile write is an upsert by user_id: the index keeps it a point lookup,
+        # and uniqueness stops concurrent upserts from creating two profiles for a new user
+        await get_profiles_collection().create_index("user_id", unique=True)
+    except Exception as e:
+        print(f"[!] Could not create profile indexes (duplicate user_id profiles must be merged first): {e}")
+
+
+async def get_saved_articles(user_id: str, limit: int = 100, cursor: Optional[ObjectId] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a user's saved articles, most recently saved first.
+    Returns (articles, next_cursor); the cursor is the latest-save _id of the page's last article.
+    """
     interactions = get_interactions_collection()
     articles_collection = get_database()["articles"]
-    
-    # Find all 'save' interactions for this user
-    saved_interactions = await interactions.find({
-        "user_id": user_id,
-        "interaction_type": "save"
-    }).sort("_id", -1).to_list(100)  # Get most recent 100 saves
-    
+
+    # Deduplicated on the server: each article once, ordered (and paginated) by its latest save
+    pipeline = [
+        {"$match": {"user_id": user_id, "interaction_type": "save", "article_id": {"$ne": None}}},
+        {"$sort": {"_id": -1}},
+        {"$group": {
+            "_id": "$article_id",
+            "last_save": {"$first": "$_id"},
+            "topic": {"$first": "$topic"},
+            "keywords": {"$first": "$keywords"},
+        }},
+    ]
+    if cursor is not None:
+        pipeline.append({"$match": {"last_save": {"$lt": cursor}}})
+    # One extra row tells whether another page exists
+    pipeline += [{"$sort": {"last_save": -1}}, {"$limit": limit + 1}]
+
+    saves = await interactions.aggregate(pipeline).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(saves) > limit:
+        saves = saves[:limit]
+        next_cursor = str(saves[-1]["last_save"])
+
+    unique = {save["_id"]: save for save in saves}
+
+    # All articles of the page in one query
+    found = {}
+    if unique:
+        docs = await articles_collection.find(
+            {"article_id": {"$in": list(unique)}}, SAVED_ARTICLE_FIELDS
+        ).to_list(length=len(unique))
+        found = {doc["article_id"]: doc for doc in docs}
+
     saved_articles = []
-    seen_article_ids = set()
-    
-    for interaction in saved_interactions:
-        article_id = interaction.get("article_id")
-        
-        # Skip duplicates
-        if article_id in seen_article_ids:
-            continue
-        seen_article_ids.add(article_id)
-        
-        # Try to fetch full article data from articles collection
-        article = await articles_collection.find_one({"article_id": article_id})
-        
+    for article_id, interaction in unique.items():
+        article = found.get(article_id)
         if article:
-            # Convert ObjectId to string if present
-            if "_id" in article and isinstance(article["_id"], ObjectId):
-                article["_id"] = str(article["_id"])
             saved_articles.append(article)
         else:
             # If article not in collection, create minimal article from interaction
@@ -127,5 +313,5 @@ async def get_saved_articles(user_id: str):
                 "summary": "Article details not available",
                 "source": "Unknown"
             })
-    
-    return saved_articles
\ No newline at end of file
+
+    return saved_articles, next_cursor
@@ -0,0 +1,114 @@
+from app.database.mongodb import get_database
+from app.api.v1.models.interaction_model import get_interactions_collection, SCORE_WEIGHTS
+from app.core.config import settings
+from pymongo import UpdateOne
+from typing import Dict, List, Tuple
+import heapq
+import time
+
+
+def get_item_neighbors_collection():
+    return get_database()["item_neighbors"]
+
+
+async def ensure_item_indexes():
+    try:
+        await get_item_neighbors_collection().create_index("article_id", unique=True)
+        # Incremental rebuilds look interactions up by article and by user
+        await get_interactions_collection().create_index("article_id")
+        await get_interactions_collection().create_index([("user_id", 1), ("_id", -1)])
+    except Exception as e:
+        print(f"[!] Could not create item neighbor indexes: {e}")
+
+
+async def save_item_neighbors(rows: Dict[str, Tuple[float, List[Tuple[str, float]]]]) -> int:
+    """Upsert {article_id: (norm, [(neighbor_id, score), ...])} with one unordered bulk_write"""
+    if not rows:
+        return 0
+
+    now = time.time()
+    operations = [
+        UpdateOne(
+            {"article_id": article_id},
+            {"$set": {
+                "norm": norm,
+                "neighbors": [[other, round(score, 5)] for other, score in neighbors],
+                "updated_at": now,
+            }},
+            upsert=True,
+        )
+        for article_id, (norm, neighbors) in rows.items()
+    ]
+    result = await get_item_neighbors_collection().bulk_write(operations, ordered=False)
+    return result.upserted_count + result.modified_count
+
+
+async def get_item_norms(article_ids: List[str]) -> Dict[str, float]:
+    if not article_ids:
+        return {}
+    docs = await get_item_neighbors_collection().find(
+        {"article_id": {"$in": article_ids}},
+        {"_id": 0, "article_id": 1, "norm": 1},
+    ).to_list(length=len(article_ids))
+    return {doc["article_id"]: doc.get("norm", 0.0) for doc in docs}
+
+
+async def get_user_article_weights(user_id: str, limit: int) -> Dict[str, float]:
+    """SCORE_WEIGHTS-weighted history of a user's most recent interactions"""
+    cursor = get_interactions_collection().find(
+        {"user_id": user_id},
+        {"_id": 0, "article_id": 1, "interaction_type": 1},
+    ).sort("_id", -1).limit(limit)
+
+    weights: Dict[str, float] = {}
+    async for doc in cursor:
+        article_id = doc.get("article_id")
+        if article_id:
+            weights[article_id] = weights.get(article_id, 0) + SCORE_WEIGHTS.get(doc.get("interaction_type"), 1)
+    return weights
+
+
+async def item_recommend_articles(user_id: str):
+    """
+    Item-based collaborative recommendations: neighbors of the articles in the user's
+    recent history, weighted by how strongly the user engaged with each one.
+    Request-time cost is two indexed lookups plus one article hydration query.
+    """
+    history = await get_user_article_weights(user_id, settings.ITEM_CF_HISTORY)
+    liked = {article_id: w for article_id, w in history.items() if w > 0}
+    if not liked:
+        return None
+
+    docs = await get_item_neighbors_collection().find(
+        {"article_id": {"$in": list(liked)}},
+        {"_id": 0, "article_id": 1, "neighbors": 1},
+    ).to_list(length=len(liked))
+
+    total_weight = sum(liked.values())
+    scores: Dict[str, float] = {}
+    for doc in docs:
+        weight = liked[doc["article_id"]] / total_weight
+        for other, score in doc.get("neighbors", []):
+            # Anything already seen (including dislikes) is not a recommendation
+            if other not in history:
+                scores[other] = scores.get(other, 0.0) + weight * score
+
+    top = heapq.nlargest(settings.ITEM_CF_RESULTS, scores.items(), key=lambda item: item[1])
+    if not top:
+        return []
+
+    articles = await get_database()["articles"].find(
+        {"article_id": {"$in": [article_id for article_id, _ in top]}},
+        {"_id": 0},
+    ).to_list(length=len(top))
+    by_id = {article["article_id"]: article for article in articles}
+
+    recommendations = []
+    for article_id, score in top:
+        article = by_id.get(article_id) or {
+            "article_id": article_id,
+            "url": article_id if article_id.startswith("http") else f"https://{article_id}",
+        }
+        recommendations.append({**article, "url": article.get("url") or article_id, "similarity": round(score, 4)})
+
+    return recommendations
@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException, Header
 from app.database.mongodb import get_database
 from app.database.redis_client import redis_client
 from app.core.config import settings
+from app.services.rec_precompute import run_precompute_cycle
+from app.services.interaction_buffer import interaction_buffer_metrics
+from app.utils.profile_keys import decode_profile
 from bson import ObjectId
 
 admin_router = APIRouter( tags=["Admin Panel"])
@@ -48,7 +51,7 @@ async def list_profiles(admin_key: str = Header(None)):
     db = get_database()
     profiles = await db["profiles"].find().to_list(500)
 
-    return [clean(p) for p in profiles]
+    return [clean(decode_profile(p)) for p in profiles]
 
 
 # ------------------- Redis Cache Keys -------------------
@@ -56,7 +59,8 @@ async def list_profiles(admin_key: str = Header(None)):
 async def get_cache_keys(admin_key: str = Header(None)):
     verify_admin(admin_key)
 
-    keys = redis_client.keys("*")
+    # SCAN instead of KEYS so a big keyspace doesn't block Redis
+    keys = [key async for key in redis_client.scan_iter(match="*", count=500)]
     # Convert bytes → string only if needed
     keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
 
@@ -69,5 +73,25 @@ async def get_cache_keys(admin_key: str = Header(None)):
 async def clear_cache(admin_key: str = Header(None)):
     verify_admin(admin_key)
 
-    redis_client.flushall()
+    await redis_client.flushall()
     return {"status": "success", "message": "Redis cache cleared"}
+
+
+# ------------------- Precompute Recommendations -------------------
+@admin_router.post("/precompute/recommendations")
+async def precompute_recommendations(admin_key: str = Header(None)):
+    verify_admin(admin_key)
+
+    stats = await run_precompute_cycle()
+    if stats is None:
+        raise HTTPException(status_code=409, detail="A precompute run is already in progress")
+
+    return {"status": "success", **stats}
+
+
+# ------------------- Interaction Buffer Metrics -------------------
+@admin_router.get("/metrics/interactions")
+async def interaction_metrics(admin_key: str = Header(None)):
+    verify_admin(admin_key)
+
+    return interaction_buffer_metrics()
@@ -1,88 +1,15 @@
 from fastapi import APIRouter, HTTPException, Query, Path
-from app.api.v1.models.article_model import save_article
 from app.core.config import settings
-from app.database.redis_client import redis_client
-from app.services.keyword_extractor import extract_keywords
-from app.services.article_fetcher import fetch_full_article
-import requests
+from app.services.news_service import build_headlines_payload, record_cache_request, VALID_CATEGORIES
+from app.services.cache_service import get_or_build, load_payload, stale_key_for
 import asyncio
 import math
-import json
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, List, Dict
-
-# --- Summarization dependencies ---
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.text_rank import TextRankSummarizer
+from typing import List, Dict
 
 
 headlines_router = APIRouter(tags=["Headlines"])
 
 
-def summarize_text(text: Optional[str], sentences: int = 8):
-    """Generate comprehensive summary using TextRank algorithm"""
-    if not text or len(text.split()) < 15:
-        return text
-
-    try:
-        parser = PlaintextParser.from_string(text, Tokenizer("english"))
-        summarizer = TextRankSummarizer()
-        
-        doc_sentences = len(parser.document.sentences)
-        
-        if doc_sentences <= 5:
-            num_sentences = doc_sentences
-        else:
-            num_sentences = max(5, min(10, int(doc_sentences * 0.25)))
-        
-        summary_sentences = summarizer(parser.document, num_sentences)
-        summary = " ".join([str(sentence) for sentence in summary_sentences])
-        
-        return summary.strip()
-    except Exception as e:
-        print(f"Summarization error: {e}")
-        return text
-
-
-def process_single_headline(article: dict, category: str) -> dict:
-    """
-    Process a single headline article: fetch full content, extract keywords, summarize.
-    """
-    article_url = article.get("url")
-    
-    # Fetch full content
-    full_content = None
-    if article_url:
-        full_content = fetch_full_article(article_url)
-    
-    # Priority: full_content > content > description > title
-    raw_text = (
-        full_content
-        or article.get("content")
-        or article.get("description")
-        or article.get("title")
-    )
-
-    # Extract keywords and summarize
-    keywords = extract_keywords(raw_text)
-    summarized = summarize_text(raw_text, sentences=8)
-
-    return {
-        "article_id": article["url"],
-        "title": article["title"],
-        "summary": summarized or article.get("description", ""),
-        "url": article["url"],
-        "source": article["source"]["name"],
-        "topic": f"headlines_{category}",
-        "category": category,
-        "keywords": keywords,
-        "has_full_content": bool(full_content),
-        "published_at": article.get("publishedAt", ""),
-        "image": article.get("image", ""),
-    }
-
-
 @headlines_router.get("/{category}")
 async def get_headlines(
     category: str = Path(
@@ -108,91 +35,25 @@ async def get_headlines(
     """
     
     # Validate category
-    valid_categories = [
-        "general", "world", "nation", "business", "technology",
-        "entertainment", "sports", "science", "health"
-    ]
-    
-    if category not in valid_categories:
+    if category not in VALID_CATEGORIES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid category. Must be one of: {', '.join(valid_categories)}"
+            detail=f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}"
         )
     
     cache_key = f"headlines:{category}"
 
-    # -------------------- Load from cache if available --------------------
-    cached = redis_client.get(cache_key)
-    base_payload: Dict[str, any] = None
-
-    if cached:
-        try:
-            base_payload = json.loads(cached)
-            source = "cache"
-            print(f"✅ Cache HIT for headlines '{category}' - {len(base_payload.get('articles', []))} articles")
-        except json.JSONDecodeError:
-            base_payload = None
-            print(f"⚠️ Cache corrupted for headlines '{category}', refetching...")
-    
-    if not base_payload:
-        # -------------------- Fetch from GNews Top Headlines API --------------------
-        url = (
-            f"https://gnews.io/api/v4/top-headlines"
-            f"?category={category}"
-            f"&lang=en"
-            f"&country=us"
-            f"&max=10"
-            f"&apikey={settings.NEWS_API_KEY}"
-        )
-        
-        print(f"🌐 Fetching headlines from GNews API: category={category}")
-        
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            print(f"📊 GNews returned {len(data.get('articles', []))} headlines for category '{category}'")
-            
-        except requests.RequestException as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to fetch headlines from GNews API: {str(e)}"
-            )
-
-        if "articles" not in data or not data["articles"]:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No headlines found for category '{category}'"
-            )
-
-        # 🚀 PROCESS ALL HEADLINES IN PARALLEL
-        loop = asyncio.get_event_loop()
-
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            tasks = [
-                loop.run_in_executor(executor, process_single_headline, article, category)
-                for article in data["articles"]
-            ]
-            articles_output = await asyncio.gather(*tasks)
-
-        print(f"✨ Processed {len(articles_output)} headlines successfully")
-
-        # Save all articles to database
-        for article_data in articles_output:
-            try:
-                await save_article(article_data)
-            except Exception as e:
-                print(f"Error saving headline {article_data.get('url')}: {e}")
-
-        base_payload = {
-            "category": category,
-            "articles": articles_output
-        }
-
-        # Cache for 5 minutes (headlines are time-sensitive)
-        redis_client.setex(cache_key, 300, json.dumps(base_payload))
-        source = "api"
+    # Only recently requested categories are kept warm by the refresh scheduler
+    await record_cache_request(cache_key)
+
+    # -------------------- Load from cache (or build once for all waiters) --------------------
+    # Cached for 5 minutes by default (headlines are time-sensitive)
+    base_payload, source = await get_or_build(
+        cache_key,
+        settings.HEADLINES_CACHE_TTL,
+        lambda: build_headlines_payload(category),
+    )
+    print(f"✅ Headlines '{category}' served from {source} - {len(base_payload.get('articles', []))} articles")
 
     # -------------------- Apply server-side pagination --------------------
     articles: List[Dict] = base_payload.get("articles", [])
@@ -223,24 +84,66 @@ async def get_headlines(
 
 
 @headlines_router.get("/")
-async def get_all_categories_preview():
+async def get_all_categories_preview(
+    categories: str = Query(
+        "general,technology,business,sports,health",
+        description="Comma-separated list of categories to preview"
+    ),
+    per_category: int = Query(2, ge=1, le=10, description="Number of articles per category"),
+    timeout: float = Query(
+        settings.PREVIEW_DEADLINE_SECONDS, gt=0, le=30,
+        description="Overall deadline in seconds"
+    ),
+):
     """
-    Get a preview of headlines from all categories (2 articles each).
+    Get a preview of headlines from several categories, built concurrently.
+    Categories that miss the deadline return their stale payload (or nothing)
+    and keep building in the background so the next call hits the cache.
     Useful for dashboard/overview pages.
     """
-    categories = ["general", "technology", "business", "sports", "health"]
-    
+    requested = list(dict.fromkeys(c.strip() for c in categories.split(",") if c.strip()))
+
+    invalid = [c for c in requested if c not in VALID_CATEGORIES]
+    if invalid or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}"
+        )
+
+    tasks = {
+        cat: asyncio.create_task(get_headlines(category=cat, page=1, page_size=per_category))
+        for cat in requested
+    }
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+
+    # The underlying builds are shielded, cancelling the wrappers doesn't stop them
+    for task in pending:
+        task.cancel()
+
     all_previews = {}
-    
-    for cat in categories:
-        try:
-            result = await get_headlines(category=cat, page=1, page_size=2)
+    statuses = {}
+
+    for cat, task in tasks.items():
+        if task in done and task.exception() is None:
+            result = task.result()
             all_previews[cat] = result["articles"]
-        except Exception as e:
-            print(f"Error fetching preview for {cat}: {e}")
+            statuses[cat] = "stale" if result["source"] == "stale" else "ok"
+            continue
+
+        if task in done:
+            print(f"Error fetching preview for {cat}: {task.exception()}")
+
+        # Not ready (or failed) - fall back to the previous payload if we have one
+        stale = await load_payload(stale_key_for(f"headlines:{cat}"))
+        if stale:
+            all_previews[cat] = stale.get("articles", [])[:per_category]
+            statuses[cat] = "stale"
+        else:
             all_previews[cat] = []
-    
+            statuses[cat] = "error" if task in done else "timeout"
+
     return {
         "previews": all_previews,
-        "total_categories": len(categories)
-    }
\ No newline at end of file
+        "status": statuses,
+        "total_categories": len(requested)
+    }
@@ -1,6 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from app.api.v1.schemas.interaction_schema import InteractionCreateSchema, InteractionResponseSchema
-from app.api.v1.models.interaction_model import record_interaction, get_saved_articles
+from fastapi import APIRouter, Body, HTTPException, Query
+from pydantic import ValidationError
+from app.api.v1.schemas.interaction_schema import (
+    InteractionCreateSchema,
+    InteractionResponseSchema,
+    InteractionBatchItemResult,
+    InteractionBatchResponseSchema,
+)
+from app.api.v1.models.interaction_model import record_interaction, apply_interactions, get_saved_articles
+from app.services.interaction_buffer import enqueue_interaction
+from app.core.config import settings
+from typing import Any, List, Optional
 from app.database.mongodb import get_database
 from bson import ObjectId
 
@@ -8,35 +17,110 @@ interaction_router = APIRouter(tags=["Interactions"])
 
 
 @interaction_router.post("/add", response_model=InteractionResponseSchema)
-async def add_user_interaction(data: InteractionCreateSchema):
+async def add_user_interaction(
+    data: InteractionCreateSchema,
+    include_profile: bool = Query(False, description="Return the updated profile (costs a read-back of the whole document)"),
+):
     """Record user interaction (like, save, dislike, read, view)"""
     
     if not data.keywords or len(data.keywords) == 0:
         raise HTTPException(status_code=400, detail="Keywords cannot be empty")
 
     try:
-        profile = await record_interaction(data.dict())
+        # Write-behind: the event is persisted by the next buffer flush
+        if not include_profile and enqueue_interaction(data.dict()):
+            return InteractionResponseSchema(
+                message="Interaction queued",
+                user_id=data.user_id,
+                article_id=data.article_id,
+                topic=data.topic,
+            )
+
+        result = await record_interaction(data.dict(), return_profile=include_profile)
 
         return InteractionResponseSchema(
             message="Interaction saved and profile updated",
             user_id=data.user_id,
             article_id=data.article_id,
             topic=data.topic,
-            updated_profile=profile
+            updated_profile=result["updated_profile"]
         )
     except Exception as e:
         print(f"Error recording interaction: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save interaction: {str(e)}")
 
 
+@interaction_router.post("/batch", response_model=InteractionBatchResponseSchema)
+async def add_user_interactions_batch(items: List[Any] = Body(...)):
+    """
+    Record many interactions (any mix of users) in one call.
+    Invalid items are reported individually; the valid ones are written with bulk writes.
+    """
+    if len(items) > settings.INTERACTION_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.INTERACTION_BATCH_MAX_ITEMS} interactions per batch")
+
+    results: List[InteractionBatchItemResult] = []
+    valid, positions = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append(InteractionBatchItemResult(index=index, status="invalid", error="Expected an interaction object"))
+            continue
+        try:
+            data = InteractionCreateSchema(**item)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+            results.append(InteractionBatchItemResult(index=index, status="invalid", error=error))
+            continue
+        if not data.keywords:
+            results.append(InteractionBatchItemResult(index=index, status="invalid", error="Keywords cannot be empty"))
+            continue
+        results.append(InteractionBatchItemResult(index=index, status="ok"))
+        valid.append(data.dict())
+        positions.append(index)
+
+    # Only a failed insert fails an item - a stored interaction must not be retried by the client
+    profile_error = None
+    try:
+        written, profile_error = await apply_interactions(valid)
+    except Exception as e:
+        print(f"Error recording interaction batch: {e}")
+        written = [(None, str(e))] * len(valid)
+
+    for index, (interaction_id, error) in zip(positions, written):
+        if error:
+            results[index].status = "failed"
+            results[index].error = error
+        else:
+            results[index].interaction_id = interaction_id
+
+    saved = sum(1 for result in results if result.status == "ok")
+    return InteractionBatchResponseSchema(
+        received=len(items),
+        saved=saved,
+        failed=len(items) - saved,
+        profile_error=profile_error,
+        results=results,
+    )
+
+
 @interaction_router.get("/saved/{user_id}")
-async def get_user_saved_articles(user_id: str):
-    """Get all saved articles for a user"""
+async def get_user_saved_articles(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """Get a user's saved articles, most recent first"""
+    if cursor is not None and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
-        saved_articles = await get_saved_articles(user_id)
+        saved_articles, next_cursor = await get_saved_articles(
+            user_id, limit=limit, cursor=ObjectId(cursor) if cursor else None
+        )
         return {
             "user_id": user_id,
             "count": len(saved_articles),
+            "next_cursor": next_cursor,
             "articles": saved_articles
         }
     except Exception as e:
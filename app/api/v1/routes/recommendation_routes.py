@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from app.api.v1.models.interaction_model import get_user_profile
 from app.api.v1.models.collab_model import collab_recommend_articles
-from app.api.v1.models.hybrid_model import hybrid_recommend
+from app.api.v1.models.hybrid_model import hybrid_recommend, get_cached_page, fetch_topic_candidates
 from app.utils.serializer import serialize_doc
-from app.database.redis_client import redis_client
+from app.services import gnews_client
+from app.services.gnews_client import GNewsError
+from app.services.article_index import get_article_index
+from app.services.keyword_matcher import get_profile_matcher
 from app.core.config import settings
-import requests
+from typing import Optional
+import base64
 
 
 rec_router = APIRouter(prefix="/recommend", tags=["Recommendations"])
@@ -13,19 +17,55 @@ rec_router = APIRouter(prefix="/recommend", tags=["Recommendations"])
 KEYWORD_FACTOR = 3
 
 
-# -------------------- SMART RECOMMENDER (MAIN ENTRY) --------------------
-@rec_router.get("/{user_id}")
-async def smart_recommend(user_id: str):
+# -------------------- Cursor helpers --------------------
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, offset = raw.split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(offset: int, page_size: int, total: int) -> Optional[str]:
+    end = offset + page_size
+    return encode_cursor(end) if end < total else None
+
+
+def paginate(items: list, offset: int, limit: int):
+    page = items[offset:offset + limit]
+    return page, next_cursor(offset, limit, len(items))
 
-    cache_key = f"hybrid_rec:{user_id}"
-    cached = redis_client.get(cache_key)
 
-    # ----- Serve Cached Response -----
-    if cached:
+# -------------------- SMART RECOMMENDER (MAIN ENTRY) --------------------
+@rec_router.get("/{user_id}")
+async def smart_recommend(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+):
+    offset = decode_cursor(cursor)
+
+    # ----- Serve Cached Ranking (written by hybrid_recommend or the precompute job) -----
+    cached = await get_cached_page(user_id, offset, limit)
+    if cached is not None:
         print("⚡ Serving from Redis Cache")
+        page, total = cached
         return {
             "source": "redis",
-            **eval(cached)
+            "recommendation_type": "hybrid",
+            "count": len(page),
+            "total": total,
+            "next_cursor": next_cursor(offset, limit, total),
+            "recommendations": page
         }
 
     # ----- Load Profile -----
@@ -34,10 +74,11 @@ async def smart_recommend(user_id: str):
     # If user never interacted → cold start
     if not profile:
         print("🧊 Cold start mode triggered")
-        cold_start_data = await fetch_trending_news()
+        cold_start_data, cold_cursor = paginate(await fetch_trending_news(), offset, limit)
         return {
             "source": "cold_start",
             "message": "No interactions yet. Showing trending news.",
+            "next_cursor": cold_cursor,
             "articles": cold_start_data
         }
 
@@ -49,37 +90,43 @@ async def smart_recommend(user_id: str):
     hybrid_results = await hybrid_recommend(user_id)
 
     if hybrid_results:
-        response_body = {
+        # The ranking is now cached - later pages are served from the sorted set
+        page, page_cursor = paginate(hybrid_results, offset, limit)
+        return {
             "source": "live",
             "recommendation_type": "hybrid",
-            "count": len(hybrid_results),
-            "recommendations": hybrid_results
+            "count": len(page),
+            "total": len(hybrid_results),
+            "next_cursor": page_cursor,
+            "recommendations": page
         }
 
-        redis_client.setex(cache_key, 600, str(response_body))  # cache 10 min
-        return response_body
-
     # ---------------- Collaborative Fallback ----------------
     collab_results = await collab_recommend_articles(user_id)
     if collab_results:
+        page, page_cursor = paginate(collab_results, offset, limit)
         return {
             "source": "collaborative",
-            "recommendations": serialize_doc(collab_results)
+            "next_cursor": page_cursor,
+            "recommendations": serialize_doc(page)
         }
 
     # ---------------- Content-Based Fallback ----------------
     content_results = await content_based_recommend(profile)
     if content_results:
+        page, page_cursor = paginate(content_results, offset, limit)
         return {
             "source": "content_based",
-            "recommendations": content_results
+            "next_cursor": page_cursor,
+            "recommendations": page
         }
 
     # ---------------- Final Fallback ----------------
-    cold_start_data = await fetch_trending_news()
+    cold_start_data, cold_cursor = paginate(await fetch_trending_news(), offset, limit)
     return {
         "source": "cold_start",
         "message": "Not enough data — showing trending news.",
+        "next_cursor": cold_cursor,
         "articles": cold_start_data
     }
 
@@ -87,24 +134,36 @@ async def smart_recommend(user_id: str):
 # ---------------- Helper: Content-Based Recommendation ----------------
 async def content_based_recommend(profile):
 
-    sorted_topics = sorted(profile["topics"].items(), key=lambda x: x[1], reverse=True)
-    top_topic, top_score = sorted_topics[0]
-
-    url = f"https://gnews.io/api/v4/search?q={top_topic}&lang=en&country=in&max=10&apikey={settings.NEWS_API_KEY}"
-    response = requests.get(url).json()
-
-    if "articles" not in response:
+    # Local candidates first: whole weighted profile against the article index
+    index = get_article_index()
+    if index is not None:
+        hits = index.search(profile.get("topics", {}), profile.get("keywords", {}), settings.ARTICLE_INDEX_RESULTS)
+        if hits:
+            return [
+                {
+                    "title": article.get("title"),
+                    "url": article.get("url"),
+                    "summary": article.get("summary", ""),
+                    "source": article.get("source"),
+                    "score": round(score, 4),
+                    "matched_keywords": matched,
+                }
+                for article, score, matched in hits
+            ]
+
+    # Fallback: live GNews search over the top topics (concurrent, deadline-bounded)
+    candidates = await fetch_topic_candidates(profile)
+    if not candidates:
         return None
 
-    user_keywords = profile.get("keywords", {})
+    matcher = get_profile_matcher(profile.get("user_id"), profile.get("keywords", {}))
     ranked_articles = []
 
-    for article in response["articles"]:
-        text = (article.get("title", "") + 
-                article.get("description", "")).lower()
+    for article, topic, topic_score in candidates:
+        text = article.get("title", "") + article.get("description", "")
 
-        matched_keywords = [kw for kw in user_keywords if kw.lower() in text]
-        score = top_score + len(matched_keywords) * KEYWORD_FACTOR
+        matched_keywords = list(matcher.find(text))
+        score = topic_score + len(matched_keywords) * KEYWORD_FACTOR
 
         ranked_articles.append({
             "title": article["title"],
@@ -122,7 +181,10 @@ async def content_based_recommend(profile):
 
 # ---------------- Cold Start (Trending Recommendations) ----------------
 async def fetch_trending_news():
-    url = f"https://gnews.io/api/v4/top-headlines?lang=en&country=in&apikey={settings.NEWS_API_KEY}"
-    response = requests.get(url).json()
-    
+    try:
+        response = await gnews_client.top_headlines(country="in")
+    except GNewsError as e:
+        print(f"GNews trending fetch failed: {e}")
+        return []
+
     return response.get("articles", [])
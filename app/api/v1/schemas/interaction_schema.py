@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Literal, List
+from typing import Literal, List, Optional
 
 # Request schema (what user sends)
 class InteractionCreateSchema(BaseModel):
@@ -16,4 +16,21 @@ class InteractionResponseSchema(BaseModel):
     user_id: str
     article_id: str
     topic: str
-    updated_profile: dict  # return updated scores so user sees learned behavior
+    updated_profile: Optional[dict] = None  # learned scores, only when the caller asks for them
+
+
+# Batch endpoint: one result per submitted item, in order
+class InteractionBatchItemResult(BaseModel):
+    index: int
+    status: Literal["ok", "invalid", "failed"]
+    interaction_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class InteractionBatchResponseSchema(BaseModel):
+    received: int
+    saved: int
+    failed: int
+    # Set when the interactions were stored but folding them into profiles failed
+    profile_error: Optional[str] = None
+    results: List[InteractionBatchItemResult]
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import List
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -8,6 +9,8 @@ class Settings(BaseSettings):
 
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT_SECONDS: float = 5.0
 
     NEWS_API_KEY: str
     ADMIN_SECRET: str = "admin123"
@@ -17,6 +20,132 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # GNews API client
+    GNEWS_TIMEOUT_SECONDS: float = 10.0
+    GNEWS_MAX_CONNECTIONS: int = 20
+    GNEWS_MAX_RETRIES: int = 2
+    GNEWS_BACKOFF_SECONDS: float = 0.5
+    # Shared by all workers and hosts through Redis (per process only while Redis is down)
+    GNEWS_RATE_PER_SECOND: float = 4.0
+    GNEWS_BURST: int = 4
+    GNEWS_DAILY_QUOTA: int = 1000  # 0 = no daily limit
+    GNEWS_CACHE_TTL: int = 900  # query-result cache, 0 = disabled
+
+    # Full-article fetcher (shared async HTTP client)
+    FETCH_MAX_CONNECTIONS: int = 50
+    FETCH_MAX_KEEPALIVE: int = 20
+    FETCH_PER_HOST_LIMIT: int = 4
+    FETCH_TIMEOUT_SECONDS: float = 8.0
+    FETCH_TOTAL_DEADLINE_SECONDS: float = 12.0
+
+    # Collaborative filtering engine
+    COLLAB_TOP_K: int = 50
+    COLLAB_ENGINE_REFRESH_SECONDS: int = 600
+
+    # Approximate (LSH) neighbor search for large user bases.
+    # More tables/probes -> better recall, slower; more bits -> smaller buckets, faster
+    COLLAB_ANN_ENABLED: bool = False
+    COLLAB_ANN_TABLES: int = 32
+    COLLAB_ANN_BITS: int = 8
+    COLLAB_ANN_PROBES: int = 2
+
+    # Item-to-item collaborative filtering (article co-occurrence)
+    ITEM_CF_ENABLED: bool = True
+    ITEM_CF_NEIGHBORS: int = 30
+    ITEM_CF_HISTORY: int = 50
+    ITEM_CF_RESULTS: int = 20
+    ITEM_CF_REFRESH_SECONDS: int = 300
+    ITEM_CF_FULL_REBUILD_SECONDS: int = 86400
+    # Incremental updates re-read this far behind the watermark (ObjectIds come from worker clocks)
+    ITEM_CF_WATERMARK_OVERLAP_SECONDS: int = 300
+    # New interactions processed per incremental batch
+    ITEM_CF_INCREMENTAL_BATCH: int = 5000
+
+    # In-process inverted index over stored articles (content-based candidates)
+    ARTICLE_INDEX_ENABLED: bool = True
+    ARTICLE_INDEX_MAX_DOCS: int = 50000
+    ARTICLE_INDEX_SYNC_SECONDS: int = 60
+    ARTICLE_INDEX_RESULTS: int = 20
+
+    # Hashed TF-IDF article vectors in a memory-mapped float32 matrix shared by the
+    # workers of one host. Row ownership lives in Redis and is shared by every host, but
+    # each host fills only its own file (rows written on other hosts read as zero).
+    ARTICLE_VECTORS_ENABLED: bool = True
+    ARTICLE_VECTORS_DIR: str = "data/article_vectors"
+    ARTICLE_VECTOR_DIM: int = 1024
+    ARTICLE_VECTOR_CAPACITY: int = 100000
+    ARTICLE_VECTOR_IDF_REFRESH_SECONDS: int = 300
+
+    # Batch precompute of hybrid recommendations for recently active users
+    PRECOMPUTE_ENABLED: bool = True
+    PRECOMPUTE_INTERVAL_SECONDS: int = 300
+    PRECOMPUTE_ACTIVE_WINDOW_SECONDS: int = 86400
+    PRECOMPUTE_MAX_USERS: int = 5000
+    PRECOMPUTE_CONCURRENCY: int = 8
+
+    # Content candidates from GNews: fan out over the top-N profile topics
+    CONTENT_TOPIC_FANOUT: int = 3
+    CONTENT_FETCH_DEADLINE_SECONDS: float = 4.0
+    # Below this many requests left today, only the top topic is searched
+    CONTENT_FANOUT_MIN_QUOTA: int = 100
+
+    # Write-behind interactions: /interactions/add queues events and a background task
+    # flushes them every INTERACTION_FLUSH_INTERVAL_MS or INTERACTION_FLUSH_MAX_EVENTS
+    INTERACTION_WRITE_BEHIND_ENABLED: bool = False
+    INTERACTION_FLUSH_INTERVAL_MS: int = 250
+    INTERACTION_FLUSH_MAX_EVENTS: int = 500
+    # Queue bound - when full, requests fall back to a synchronous write
+    INTERACTION_BUFFER_CAPACITY: int = 10000
+    # A failing flush step is retried with exponential backoff before its events are dropped
+    INTERACTION_FLUSH_ATTEMPTS: int = 5
+    INTERACTION_FLUSH_BACKOFF_MS: int = 200
+
+    # Bounded profiles: weights decay exponentially since the last compaction and are
+    # pruned to the strongest PROFILE_MAX_* entries. A profile is compacted once it is
+    # PROFILE_COMPACT_INTERVAL_SECONDS old or has gained PROFILE_COMPACT_SLACK_KEYS new keys.
+    PROFILE_DECAY_HALF_LIFE_DAYS: float = 30.0  # 0 = no decay
+    PROFILE_MAX_KEYWORDS: int = 200
+    PROFILE_MAX_TOPICS: int = 30
+    PROFILE_COMPACT_INTERVAL_SECONDS: int = 86400
+    PROFILE_COMPACT_SLACK_KEYS: int = 100
+
+    # Largest list accepted by POST /interactions/batch
+    INTERACTION_BATCH_MAX_ITEMS: int = 1000
+
+    # Persist enriched articles without blocking the response
+    ARTICLE_SAVE_IN_BACKGROUND: bool = True
+
+    # NLP process pool (0 = one worker per CPU core)
+    NLP_WORKERS: int = 0
+
+    # Cache TTLs (seconds)
+    NEWS_CACHE_TTL: int = 600
+    HEADLINES_CACHE_TTL: int = 300
+
+    # Single-flight cache builds
+    CACHE_STALE_TTL: int = 3600
+    CACHE_LOCK_LEASE_SECONDS: int = 60
+    CACHE_LOCK_WAIT_SECONDS: float = 30.0
+    CACHE_LOCK_POLL_SECONDS: float = 0.25
+
+    # All-categories headlines preview
+    PREVIEW_DEADLINE_SECONDS: float = 8.0
+
+    # Refresh-ahead background ingestion
+    REFRESH_AHEAD_ENABLED: bool = True
+    REFRESH_INTERVAL_SECONDS: int = 30
+    REFRESH_LEAD_SECONDS: int = 90
+    REFRESH_CONCURRENCY: int = 2
+    REFRESH_TOPICS: List[str] = []
+    REFRESH_TOP_TOPICS: int = 10
+    # Entries not requested for this long are left to expire instead of being refreshed
+    REFRESH_IDLE_SECONDS: int = 900
+    # Share of GNEWS_DAILY_QUOTA that background refreshes may spend (the rest is kept for requests)
+    REFRESH_QUOTA_SHARE: float = 0.5
+    # Topic popularity is halved this often and trimmed to the top TOPIC_HITS_MAX topics
+    TOPIC_HITS_DECAY_SECONDS: int = 3600
+    TOPIC_HITS_MAX: int = 1000
+
     class Config:
         env_file = ".env"
 
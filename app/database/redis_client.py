@@ -1,8 +1,52 @@
-import redis
+import redis.asyncio as redis
 from app.core.config import settings
+from typing import Any, Dict, List, Sequence, Tuple
 
-redis_client = redis.Redis(
+# Bounded pool shared by every coroutine in this worker.
+# Callers wait (up to REDIS_POOL_TIMEOUT_SECONDS) for a free connection instead of opening more.
+redis_pool = redis.BlockingConnectionPool(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
-    decode_responses=True
+    decode_responses=True,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
 )
+
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+
+async def connect_to_redis():
+    await redis_client.ping()
+
+
+async def close_redis_connection():
+    await redis_client.aclose()
+    await redis_pool.disconnect()
+    print("[-] Redis connection closed")
+
+
+async def pipeline_ops(ops: Sequence[Tuple]) -> List[Any]:
+    """
+    Run several commands in one round trip (no MULTI/EXEC).
+    Each op is (command, *args), e.g. ("get", key), ("setex", key, ttl, value), ("delete", key).
+    Returns the results in the same order.
+    """
+    if not ops:
+        return []
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for command, *args in ops:
+            getattr(pipe, command)(*args)
+        return await pipe.execute()
+
+
+async def get_many(keys: Sequence[str]) -> List[Any]:
+    return await pipeline_ops([("get", key) for key in keys])
+
+
+async def set_many(items: Dict[str, str], ttl: int) -> List[Any]:
+    return await pipeline_ops([("setex", key, ttl, value) for key, value in items.items()])
+
+
+async def delete_many(keys: Sequence[str]) -> List[Any]:
+    return await pipeline_ops([("delete", key) for key in keys])
@@ -5,8 +5,26 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 
 # DB Connections
-from app.database.mongodb import connect_to_mongo, close_mongo_connection
-from app.database.redis_client import redis_client
+from app.database.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from app.database.redis_client import connect_to_redis, close_redis_connection
+
+# Models
+from app.api.v1.models.article_model import ensure_article_indexes, flush_background_saves
+from app.api.v1.models.item_model import ensure_item_indexes
+from app.api.v1.models.interaction_model import ensure_interaction_indexes, ensure_profile_indexes
+
+# Services
+from app.services.article_fetcher import init_fetcher_client, close_fetcher_client
+from app.services.gnews_client import init_gnews_client, close_gnews_client
+from app.services.nlp_pool import start_nlp_pool, shutdown_nlp_pool
+from app.services.refresh_scheduler import start_refresh_scheduler, stop_refresh_scheduler
+from app.services.item_index import start_item_index_scheduler, stop_item_index_scheduler
+from app.services.article_index import load_article_index
+from app.services.article_vectors import (
+    open_article_vectors, close_article_vectors, start_article_vector_backfill, stop_article_vector_backfill,
+)
+from app.services.rec_precompute import start_precompute_scheduler, stop_precompute_scheduler
+from app.services.interaction_buffer import start_interaction_buffer, stop_interaction_buffer
 
 # Routers
 from app.api.v1.routes.user_routes import user_router
@@ -49,18 +67,64 @@ async def startup_event():
     await connect_to_mongo()
     print("[+] MongoDB Connected")
 
+    if get_database() is not None:
+        await ensure_article_indexes()
+        await ensure_item_indexes()
+        await ensure_interaction_indexes()
+        await ensure_profile_indexes()
+        # Local keyword/topic index over stored articles for content-based candidates
+        await load_article_index()
+
+    # Shared memory-mapped TF-IDF matrix (every worker maps the same file)
+    open_article_vectors()
+
     print("[*] Connecting to Redis...")
-    redis_client.ping()
+    await connect_to_redis()
     print("[+] Redis Connected")
 
+    await init_fetcher_client()
+    await init_gnews_client()
+    start_nlp_pool()
+
+    # Vectorize articles stored before this host's matrix existed (BM25 serves meanwhile)
+    if get_database() is not None:
+        start_article_vector_backfill()
+
+    # Keep headlines + popular topics warm before their TTL runs out
+    start_refresh_scheduler()
+
+    # Keep the article co-occurrence (item-to-item) neighbors table current
+    start_item_index_scheduler()
+
+    # Materialize hybrid recommendations for recently active users
+    start_precompute_scheduler()
+
+    # Batch interaction writes in the background (when write-behind is enabled)
+    start_interaction_buffer()
+
 
 # -----------------------------
 #       SHUTDOWN EVENT
 # -----------------------------
 @app.on_event("shutdown")
 async def shutdown_event():
+    await stop_refresh_scheduler()
+    await stop_item_index_scheduler()
+    await stop_precompute_scheduler()
+    # Queued interactions are written before the database connections close
+    await stop_interaction_buffer()
+    await stop_article_vector_backfill()
+    await close_fetcher_client()
+    await close_gnews_client()
+    shutdown_nlp_pool()
+
+    await flush_background_saves()
+    close_article_vectors()
+
     print("[-] Closing MongoDB connection...")
     await close_mongo_connection()
+
+    await close_redis_connection()
     print("[*] Shutdown complete.")
 
 
@@ -0,0 +1,96 @@
+from collections import defaultdict
+from scipy import sparse
+from typing import Dict, List, Set
+import numpy as np
+
+
+class LSHIndex:
+    """
+    Random-projection (SimHash) LSH over L2-normalized sparse rows.
+
+    Each of `n_tables` tables hashes a row to `n_bits` sign bits of random
+    projections. A query probes its own bucket plus, per table, the buckets
+    reached by flipping its `n_probes` least certain bits (multi-probe LSH).
+
+    Recall-vs-latency knobs: more tables / probes -> higher recall, more
+    candidates; more bits -> smaller buckets, fewer candidates.
+    """
+
+    def __init__(self, n_tables: int = 32, n_bits: int = 8, n_probes: int = 2, seed: int = 42):
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.n_probes = n_probes
+        self._rng = np.random.default_rng(seed)
+
+        # keyword column -> projections for every (table, bit), grown as vocab grows
+        self.projections = np.empty((0, n_tables * n_bits), dtype=np.float32)
+        self._bit_weights = (1 << np.arange(n_bits, dtype=np.int64))
+
+        self.tables: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in range(n_tables)]
+        self.row_codes: Dict[int, np.ndarray] = {}
+
+    # -------------------- Hashing --------------------
+    def _ensure_columns(self, n_columns: int):
+        missing = n_columns - self.projections.shape[0]
+        if missing > 0:
+            extra = self._rng.standard_normal((missing, self.projections.shape[1])).astype(np.float32)
+            self.projections = np.vstack([self.projections, extra])
+
+    def _project(self, rows: sparse.csr_matrix) -> np.ndarray:
+        self._ensure_columns(rows.shape[1])
+        return np.asarray(rows @ self.projections[:rows.shape[1]])
+
+    def _codes(self, projected: np.ndarray) -> np.ndarray:
+        bits = (projected > 0).reshape(-1, self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._bit_weights
+
+    # -------------------- Build / update --------------------
+    def build(self, matrix: sparse.csr_matrix, batch_size: int = 8192):
+        for start in range(0, matrix.shape[0], batch_size):
+            block = matrix[start:start + batch_size]
+            codes = self._codes(self._project(block))
+            for offset, row_codes in enumerate(codes):
+                # Empty rows can't be similar to anything - keep them out of the buckets
+                if block.indptr[offset] == block.indptr[offset + 1]:
+                    continue
+                self._insert(start + offset, row_codes)
+        return self
+
+    def _insert(self, row: int, codes: np.ndarray):
+        self.row_codes[row] = codes
+        for table, code in zip(self.tables, codes):
+            table[int(code)].add(row)
+
+    def remove(self, row: int):
+        codes = self.row_codes.pop(row, None)
+        if codes is None:
+            return
+        for table, code in zip(self.tables, codes):
+            bucket = table.get(int(code))
+            if bucket is not None:
+                bucket.discard(row)
+                if not bucket:
+                    del table[int(code)]
+
+    def upsert(self, row: int, vector: sparse.csr_matrix):
+        """Insert a new row or re-hash an updated one"""
+        self.remove(row)
+        if vector is not None and vector.nnz:
+            self._insert(row, self._codes(self._project(vector))[0])
+
+    # -------------------- Query --------------------
+    def candidates(self, vector: sparse.csr_matrix) -> np.ndarray:
+        projected = self._project(vector).reshape(self.n_tables, self.n_bits)
+        codes = self._codes(projected.reshape(1, -1))[0]
+
+        # Bits whose projection is closest to zero are the most likely to be wrong
+        probe_bits = np.argsort(np.abs(projected), axis=1)[:, :self.n_probes]
+
+        found: Set[int] = set()
+        for t, table in enumerate(self.tables):
+            code = int(codes[t])
+            found.update(table.get(code, ()))
+            for bit in probe_bits[t]:
+                found.update(table.get(code ^ (1 << int(bit)), ()))
+
+        return np.fromiter(found, dtype=np.int64, count=len(found))
@@ -1,43 +1,146 @@
 from newspaper import Article
-import requests
 from bs4 import BeautifulSoup
-from typing import Optional
+from typing import Optional, Dict, List
+from urllib.parse import urlparse
+from app.core.config import settings
+import asyncio
+import httpx
 
-def fetch_full_article(url: str) -> Optional[str]:
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# App-lifetime HTTP client (created on startup, closed on shutdown)
+_client: Optional[httpx.AsyncClient] = None
+
+# One semaphore per host so a single slow publisher can't hog the pool
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+async def init_fetcher_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.FETCH_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.FETCH_MAX_KEEPALIVE,
+            ),
+        )
+        print("[+] Article fetcher HTTP client ready")
+
+
+async def close_fetcher_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _host_semaphores.clear()
+        print("[-] Article fetcher HTTP client closed")
+
+
+def _get_client() -> httpx.AsyncClient:
+    # Lazily create the client if startup hook did not run (scripts, shells)
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.FETCH_TIMEOUT_SECONDS),
+        )
+    return _client
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlparse(url).netloc.lower()
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        sem = asyncio.Semaphore(settings.FETCH_PER_HOST_LIMIT)
+        _host_semaphores[host] = sem
+    return sem
+
+
+def extract_article_text(url: str, html: str) -> Optional[str]:
     """
-    Fetch full article content from URL.
-    Falls back to basic scraping if newspaper3k fails.
+    Extract article text from already downloaded HTML.
+    Tries newspaper3k first, then falls back to BeautifulSoup on the same bytes.
     """
     try:
         # Method 1: newspaper3k (best for news articles)
         article = Article(url)
-        article.download()
+        article.download(input_html=html)
         article.parse()
-        
+
         if article.text and len(article.text) > 200:
             return article.text
-            
+
     except Exception as e:
         print(f"Newspaper3k failed for {url}: {e}")
-    
-    # Method 2: Fallback with requests + BeautifulSoup
+
+    # Method 2: Fallback with BeautifulSoup
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
+        soup = BeautifulSoup(html, 'html.parser')
+
         # Remove unwanted elements
         for element in soup(["script", "style", "nav", "footer", "header", "aside"]):
             element.decompose()
-        
+
         # Get text from paragraphs
         paragraphs = soup.find_all('p')
         text = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        
+
         return text if len(text) > 200 else None
-        
+
     except Exception as e:
         print(f"Fallback scraping failed for {url}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+async def fetch_full_article(url: str) -> Optional[str]:
+    """
+    Fetch full article content from URL.
+    The page is downloaded once and both extraction strategies run on it.
+    """
+    try:
+        async with _host_semaphore(url):
+            response = await _get_client().get(url)
+            response.raise_for_status()
+            html = response.text
+    except Exception as e:
+        print(f"Download failed for {url}: {e}")
+        return None
+
+    # Parsing is CPU-bound, keep it off the event loop
+    return await asyncio.to_thread(extract_article_text, url, html)
+
+
+async def fetch_full_articles(urls: List[str], deadline: Optional[float] = None) -> Dict[str, Optional[str]]:
+    """
+    Fetch many articles concurrently under a total deadline (seconds).
+    URLs that are not done when the deadline hits map to None.
+    """
+    deadline = deadline if deadline is not None else settings.FETCH_TOTAL_DEADLINE_SECONDS
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+
+    if not unique_urls:
+        return {}
+
+    tasks = {url: asyncio.create_task(fetch_full_article(url)) for url in unique_urls}
+    done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+
+    for task in pending:
+        task.cancel()
+
+    if pending:
+        print(f"⏱️ Fetch deadline hit: {len(pending)}/{len(unique_urls)} articles skipped")
+
+    results = {}
+    for url, task in tasks.items():
+        if task in done and not task.cancelled() and task.exception() is None:
+            results[url] = task.result()
+        else:
+            results[url] = None
+
+    return results
@@ -0,0 +1,266 @@
+from app.core.config import settings
+from app.database.mongodb import get_database
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import asyncio
+import heapq
+import math
+import time
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOPIC_PREFIX = "topic:"
+
+# Re-read a few seconds before the last seen save so concurrent writers aren't missed (re-adding is idempotent)
+SYNC_OVERLAP_SECONDS = 5
+
+# Fields kept in memory per article (enough to render a recommendation)
+INDEX_FIELDS = {
+    "_id": 0, "article_id": 1, "title": 1, "url": 1, "summary": 1, "source": 1,
+    "topic": 1, "keywords": 1, "published_at": 1, "image": 1, "saved_at": 1,
+}
+
+
+def article_terms(article: dict) -> Dict[str, int]:
+    """Index terms of a stored article: its keywords plus a `topic:` term"""
+    terms: Dict[str, int] = {}
+    for kw in article.get("keywords") or []:
+        term = str(kw).strip().lower()
+        if term:
+            terms[term] = terms.get(term, 0) + 1
+    topic = (article.get("topic") or "").strip().lower()
+    if topic:
+        terms[TOPIC_PREFIX + topic] = 1
+    return terms
+
+
+class ArticleIndex:
+    """
+    In-process inverted index over stored articles: term -> {doc: tf}.
+    A user's whole weighted keyword/topic profile is scored with BM25 in one pass
+    over the postings of the profile's terms, accumulated into a dense score array.
+
+    Holds at most `max_docs` articles (oldest added are evicted first). Freed doc
+    numbers are reused lowest-first, so the score array stays sized to the live docs.
+    """
+
+    def __init__(self, max_docs: Optional[int] = None):
+        self.max_docs = max_docs
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.docs: Dict[int, dict] = {}
+        self.doc_terms: Dict[int, Dict[str, int]] = {}
+        # Insertion order doubles as the eviction order
+        self.doc_ids: "OrderedDict[str, int]" = OrderedDict()
+        self.total_length = 0
+        self._next_doc = 0
+        self._free_docs: List[int] = []
+
+        # Numpy views of postings (rebuilt lazily per term after a change) and doc lengths
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.lengths = np.zeros(1024, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, article: dict):
+        article_id = article.get("article_id")
+        if not article_id:
+            return
+
+        terms = article_terms(article)
+        fields = {key: article[key] for key in INDEX_FIELDS if key in article and key != "_id"}
+
+        # Re-synced articles are usually unchanged - nothing to do
+        doc = self.doc_ids.get(article_id)
+        if doc is not None and self.doc_terms[doc] == terms and self.docs[doc] == fields:
+            return
+
+        self.remove(article_id)
+        if not terms:
+            return
+
+        doc = self._allocate_doc()
+        self.doc_ids[article_id] = doc
+        self.docs[doc] = fields
+        self.doc_terms[doc] = terms
+        self.lengths[doc] = sum(terms.values())
+        self.total_length += sum(terms.values())
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc] = tf
+            self._arrays.pop(term, None)
+
+        if self.max_docs is not None:
+            while len(self.doc_ids) > self.max_docs:
+                self.remove(next(iter(self.doc_ids)))
+
+    def _allocate_doc(self) -> int:
+        if self._free_docs:
+            return heapq.heappop(self._free_docs)
+
+        doc = self._next_doc
+        self._next_doc += 1
+        if doc >= len(self.lengths):
+            self.lengths = np.concatenate([self.lengths, np.zeros(len(self.lengths), dtype=np.float32)])
+        return doc
+
+    def get(self, article_id: str) -> Optional[dict]:
+        doc = self.doc_ids.get(article_id)
+        return self.docs.get(doc) if doc is not None else None
+
+    def add_many(self, articles: Iterable[dict]):
+        for article in articles:
+            self.add(article)
+
+    def remove(self, article_id: str):
+        doc = self.doc_ids.pop(article_id, None)
+        if doc is None:
+            return
+
+        terms = self.doc_terms.pop(doc)
+        self.total_length -= sum(terms.values())
+        self.lengths[doc] = 0
+        del self.docs[doc]
+        heapq.heappush(self._free_docs, doc)
+        for term in terms:
+            self._arrays.pop(term, None)
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(
+        self,
+        topics: Dict[str, float],
+        keywords: Dict[str, float],
+        limit: int = 20,
+        exclude: Iterable[str] = (),
+    ) -> List[Tuple[dict, float, List[str]]]:
+        """
+        Top `limit` articles for a weighted profile as (article, score, matched_keywords).
+        Negative profile weights (dislikes) push matching articles down.
+        """
+        if not self.docs:
+            return []
+
+        query: Dict[str, Tuple[float, Optional[str]]] = {}
+        for topic, weight in topics.items():
+            query[TOPIC_PREFIX + topic.strip().lower()] = (float(weight), None)
+        for kw, weight in keywords.items():
+            query[kw.strip().lower()] = (float(weight), kw)
+
+        n_docs = len(self.docs)
+        avg_length = self.total_length / n_docs
+        scores = np.zeros(self._next_doc, dtype=np.float32)
+
+        for term, (weight, _) in query.items():
+            if not weight or term not in self.postings:
+                continue
+
+            docs, tfs = self._posting_arrays(term)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[docs] / avg_length)
+            scores[docs] += weight * idf * tfs * (BM25_K1 + 1) / (tfs + length_norm)
+
+        for article_id in exclude:
+            if article_id in self.doc_ids:
+                scores[self.doc_ids[article_id]] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        ordered = candidates[np.argsort(scores[candidates])[::-1]]
+
+        results = []
+        for doc in ordered.tolist():
+            matched = [
+                query[term][1] for term in self.doc_terms[doc]
+                if term in query and query[term][1] is not None and query[term][0] > 0
+            ]
+            results.append((self.docs[doc], float(scores[doc]), matched))
+        return results
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings[term]
+            arrays = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float32, count=len(posting)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+
+# -------------------- App-lifetime index --------------------
+_index: Optional[ArticleIndex] = None
+_synced_at = 0.0
+_last_saved_at = 0.0
+_sync_task: Optional[asyncio.Task] = None
+
+
+def _track_saved_at(articles: Iterable[dict]):
+    global _last_saved_at
+    for article in articles:
+        saved_at = article.get("saved_at") or 0
+        if saved_at > _last_saved_at:
+            _last_saved_at = saved_at
+
+
+async def load_article_index():
+    """Build the index from the newest ARTICLE_INDEX_MAX_DOCS stored articles (startup)"""
+    global _index, _synced_at
+    if not settings.ARTICLE_INDEX_ENABLED:
+        return
+
+    started = time.perf_counter()
+    cursor = get_database()["articles"].find({}, INDEX_FIELDS).sort("_id", -1).limit(settings.ARTICLE_INDEX_MAX_DOCS).batch_size(2000)
+    articles = [doc async for doc in cursor]
+
+    index = ArticleIndex(max_docs=settings.ARTICLE_INDEX_MAX_DOCS)
+    await asyncio.to_thread(index.add_many, reversed(articles))
+    _track_saved_at(articles)
+
+    _index = index
+    _synced_at = time.time()
+    print(f"[+] Article index loaded: {len(index)} articles, {len(index.postings)} terms in {time.perf_counter() - started:.2f}s")
+
+
+async def _sync_from_db():
+    """Pick up articles saved by other workers since the last sync"""
+    global _synced_at
+    try:
+        cursor = get_database()["articles"].find({"saved_at": {"$gt": _last_saved_at - SYNC_OVERLAP_SECONDS}}, INDEX_FIELDS).batch_size(2000)
+        articles = [doc async for doc in cursor]
+        if articles and _index is not None:
+            _index.add_many(articles)
+            _track_saved_at(articles)
+    except Exception as e:
+        print(f"Article index sync failed: {e}")
+    finally:
+        _synced_at = time.time()
+
+
+def index_articles(articles: List[dict]):
+    """Add freshly saved articles to this worker's index (the sync watermark only follows the DB)"""
+    if _index is not None:
+        _index.add_many(articles)
+
+
+def get_article_index() -> Optional[ArticleIndex]:
+    """
+    Current index (None if not loaded). Articles written by other workers are
+    merged in by a background sync every ARTICLE_INDEX_SYNC_SECONDS.
+    """
+    global _sync_task
+    if _index is None:
+        return None
+
+    stale = time.time() - _synced_at >= settings.ARTICLE_INDEX_SYNC_SECONDS
+    if stale and (_sync_task is None or _sync_task.done()):
+        _sync_task = asyncio.create_task(_sync_from_db())
+
+    return _index
@@ -0,0 +1,395 @@
+from app.core.config import settings
+from app.database.mongodb import get_database
+from app.database.redis_client import redis_client, pipeline_ops
+from app.services.cache_service import acquire_lock, release_lock
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import asyncio
+import os
+import re
+import socket
+import time
+import zlib
+
+# Row bookkeeping shared by every worker
+NEXT_ROW_KEY = "article_vectors:next_row"
+ROW_BY_ID_KEY = "article_vectors:row_by_id"
+ID_BY_ROW_KEY = "article_vectors:id_by_row"
+DF_KEY = "article_vectors:df"
+DOC_COUNT_KEY = "article_vectors:docs"
+ROW_BUCKETS_KEY = "article_vectors:row_buckets"
+
+# Atomically claim a row per article id. Rows form a ring over the capacity: once it
+# is full the oldest row is reused and its previous article unmapped. Returns
+# [row, claimed (1 = new row for this id), evicted row's buckets] per id, so only the
+# worker that claimed a row updates document frequencies.
+# KEYS: next_row, row_by_id, id_by_row, row_buckets, docs   ARGV: capacity, ids...
+_CLAIM_ROWS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local out = {}
+for i = 2, #ARGV do
+    local row = redis.call('hget', KEYS[2], ARGV[i])
+    local claimed, evicted = 0, ''
+    if not row then
+        row = tostring((redis.call('incr', KEYS[1]) - 1) % capacity)
+        local previous = redis.call('hget', KEYS[3], row)
+        if previous then
+            redis.call('hdel', KEYS[2], previous)
+            evicted = redis.call('hget', KEYS[4], row) or ''
+        else
+            redis.call('incr', KEYS[5])
+        end
+        redis.call('hset', KEYS[2], ARGV[i], row)
+        redis.call('hset', KEYS[3], row, ARGV[i])
+        claimed = 1
+    end
+    table.insert(out, row)
+    table.insert(out, claimed)
+    table.insert(out, evicted)
+end
+return out
+"""
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+# Keywords and topic describe the article better than free text - weight them up
+KEYWORD_BOOST = 2.0
+
+# Backfill of stored articles into this host's matrix
+BACKFILL_FIELDS = {"_id": 0, "article_id": 1, "title": 1, "summary": 1, "topic": 1, "keywords": 1}
+BACKFILL_BATCH_SIZE = 500
+BACKFILL_LEASE_SECONDS = 1800
+BACKFILL_WAIT_SECONDS = 30
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def hash_token(token: str, dim: int) -> int:
+    # crc32 is stable across processes (unlike hash()), so every worker agrees on buckets
+    return zlib.crc32(token.encode("utf-8")) % dim
+
+
+def hashed_counts(weighted_texts: Iterable[Tuple[str, float]], dim: int) -> Dict[int, float]:
+    counts: Dict[int, float] = {}
+    for text, weight in weighted_texts:
+        if not weight:
+            continue
+        for token in tokenize(text):
+            bucket = hash_token(token, dim)
+            counts[bucket] = counts.get(bucket, 0.0) + weight
+    return counts
+
+
+def article_counts(article: dict, dim: int) -> Dict[int, float]:
+    texts = [(article.get("title") or "", 1.0), (article.get("summary") or "", 1.0)]
+    texts += [(kw, KEYWORD_BOOST) for kw in article.get("keywords") or []]
+    texts.append((article.get("topic") or "", KEYWORD_BOOST))
+    return hashed_counts(texts, dim)
+
+
+class ArticleVectorStore:
+    """
+    Fixed-width float32 matrix (capacity x dim) in a file memory-mapped by every
+    worker, so the OS shares one copy of the pages. Each row is an article's
+    L2-normalized hashed TF-IDF vector; ranking is one mat-vec over the used rows.
+    Rows are used as a ring, so the newest `capacity` articles are kept.
+
+    The file is local to a host while row ownership (id <-> row) and document
+    frequencies live in shared Redis. With several hosts, a row claimed by an
+    article saved on another host reads as a zero vector here (it never matches)
+    until this host vectorizes that article itself - the BM25 index still covers it.
+    """
+
+    def __init__(self, path: str, dim: int, capacity: int):
+        self.path = path
+        self.dim = dim
+        self.capacity = capacity
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        size = dim * capacity * 4
+        # Append mode never truncates, so concurrent workers can all run this safely
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+
+        self.matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+
+    def write(self, row: int, vector: np.ndarray):
+        self.matrix[row] = vector
+
+    def scores(self, queries: np.ndarray, n_rows: int) -> np.ndarray:
+        """(n_rows x len(queries)) cosines - one mat-mat product for a stack of query vectors"""
+        return self.matrix[:min(n_rows, self.capacity)] @ queries.T
+
+    @property
+    def marker_path(self) -> str:
+        # Written once this host's matrix holds every stored article (see backfill)
+        return self.path + ".backfilled"
+
+    def close(self):
+        self.matrix.flush()
+        del self.matrix
+
+
+# -------------------- App-lifetime store --------------------
+_store: Optional[ArticleVectorStore] = None
+_idf: Optional[np.ndarray] = None
+_idf_loaded_at = 0.0
+_ready = False
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def open_article_vectors():
+    global _store
+    if not settings.ARTICLE_VECTORS_ENABLED or _store is not None:
+        return
+    try:
+        _store = ArticleVectorStore(
+            os.path.join(settings.ARTICLE_VECTORS_DIR, f"vectors_{settings.ARTICLE_VECTOR_DIM}.f32"),
+            settings.ARTICLE_VECTOR_DIM,
+            settings.ARTICLE_VECTOR_CAPACITY,
+        )
+        print(f"[+] Article vectors mapped: {_store.path} ({settings.ARTICLE_VECTOR_CAPACITY} x {settings.ARTICLE_VECTOR_DIM})")
+    except Exception as e:
+        print(f"[!] Article vectors disabled: {e}")
+
+
+def close_article_vectors():
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+
+async def _get_idf(force: bool = False) -> np.ndarray:
+    """IDF per bucket from the shared document frequencies (refreshed periodically)"""
+    global _idf, _idf_loaded_at
+    if not force and _idf is not None and time.time() - _idf_loaded_at < settings.ARTICLE_VECTOR_IDF_REFRESH_SECONDS:
+        return _idf
+
+    df_raw, docs = await pipeline_ops([("hgetall", DF_KEY), ("get", DOC_COUNT_KEY)])
+    df = np.zeros(settings.ARTICLE_VECTOR_DIM, dtype=np.float32)
+    for bucket, count in (df_raw or {}).items():
+        df[int(bucket)] = float(count)
+
+    _idf = np.log((1 + float(docs or 0)) / (1 + df)).astype(np.float32) + 1
+    _idf_loaded_at = time.time()
+    return _idf
+
+
+def _to_vector(counts: Dict[int, float], idf: np.ndarray, log_tf: bool) -> np.ndarray:
+    vector = np.zeros(len(idf), dtype=np.float32)
+    if counts:
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        if log_tf:
+            values = np.log1p(values)
+        vector[buckets] = values * idf[buckets]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+async def claim_rows(article_ids: List[str], capacity: int) -> List[Tuple[int, bool, List[int]]]:
+    """(row, newly claimed, buckets of the evicted article) per id - see _CLAIM_ROWS_SCRIPT"""
+    result = await redis_client.eval(
+        _CLAIM_ROWS_SCRIPT, 5,
+        NEXT_ROW_KEY, ROW_BY_ID_KEY, ID_BY_ROW_KEY, ROW_BUCKETS_KEY, DOC_COUNT_KEY,
+        capacity, *article_ids,
+    )
+    return [
+        (int(result[i]), bool(int(result[i + 1])), [int(b) for b in (result[i + 2] or "").split()])
+        for i in range(0, len(result), 3)
+    ]
+
+
+async def _vectorize(articles: List[dict], force_idf: bool = False):
+    counts = {a["article_id"]: article_counts(a, _store.dim) for a in articles if a.get("article_id")}
+    if not counts:
+        return
+
+    ids = list(counts)
+    claims = await claim_rows(ids, _store.capacity)
+
+    ops = []
+    rows: Dict[str, int] = {}
+    for aid, (row, claimed, evicted) in zip(ids, claims):
+        rows[aid] = row
+        if not claimed:
+            continue
+        # Only the claiming worker counts the article, so DF is never double-counted
+        ops += [("hincrby", DF_KEY, bucket, -1) for bucket in evicted]
+        ops += [("hincrby", DF_KEY, bucket, 1) for bucket in counts[aid]]
+        ops.append(("hset", ROW_BUCKETS_KEY, row, " ".join(str(b) for b in counts[aid])))
+    await pipeline_ops(ops)
+
+    idf = await _get_idf(force=force_idf)
+    for aid, row in rows.items():
+        _store.write(row, _to_vector(counts[aid], idf, log_tf=True))
+
+
+async def vectorize_articles(articles: List[dict]):
+    """Write hashed TF-IDF rows for freshly saved articles (new ones claim a row)"""
+    if _store is None or not articles:
+        return
+    try:
+        await _vectorize(articles)
+    except Exception as e:
+        print(f"Article vectorization failed: {e}")
+
+
+def vectors_ready() -> bool:
+    """True once this host's matrix has been backfilled with the stored articles"""
+    global _ready
+    if not _ready and _store is not None:
+        _ready = os.path.exists(_store.marker_path)
+    return _ready
+
+
+async def backfill_article_vectors():
+    """
+    Vectorize the newest ARTICLE_VECTOR_CAPACITY stored articles into this host's
+    matrix, oldest first so the ring keeps the newest. One worker per host does it
+    (the others share the file and wait for the marker). The second pass rewrites
+    every row with the IDF of the complete corpus.
+    """
+    if _store is None or vectors_ready():
+        return
+
+    # Wait while another worker on this host backfills; take over if it gives up
+    lock_name = f"article_vectors:backfill:{socket.gethostname()}"
+    while True:
+        token = await acquire_lock(lock_name, BACKFILL_LEASE_SECONDS)
+        if token is not None:
+            break
+        await asyncio.sleep(BACKFILL_WAIT_SECONDS)
+        if vectors_ready():
+            return
+
+    try:
+        if vectors_ready():
+            return
+        started = time.perf_counter()
+        cursor = get_database()["articles"].find({}, BACKFILL_FIELDS).sort("_id", -1).limit(_store.capacity).batch_size(2000)
+        articles = [doc async for doc in cursor]
+        articles.reverse()
+
+        for force_idf in (False, True):
+            for start in range(0, len(articles), BACKFILL_BATCH_SIZE):
+                await _vectorize(articles[start:start + BACKFILL_BATCH_SIZE], force_idf=force_idf and start == 0)
+
+        _store.matrix.flush()
+        with open(_store.marker_path, "w") as f:
+            f.write(str(time.time()))
+        print(f"[+] Article vectors backfilled: {len(articles)} articles in {time.perf_counter() - started:.2f}s")
+    finally:
+        await release_lock(lock_name, token)
+
+
+async def _run_backfill():
+    try:
+        await backfill_article_vectors()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Content candidates keep coming from the BM25 index until the next start
+        print(f"[!] Article vector backfill failed: {e}")
+
+
+def start_article_vector_backfill():
+    global _backfill_task
+    if _store is not None and _backfill_task is None and not vectors_ready():
+        _backfill_task = asyncio.create_task(_run_backfill())
+
+
+async def stop_article_vector_backfill():
+    global _backfill_task
+    if _backfill_task is not None:
+        _backfill_task.cancel()
+        try:
+            await _backfill_task
+        except asyncio.CancelledError:
+            pass
+        _backfill_task = None
+
+
+async def _ids_for_rows(rows: List[int]) -> Dict[int, str]:
+    # Always read from Redis: rows are reused once the ring wraps, possibly by another worker
+    found = await redis_client.hmget(ID_BY_ROW_KEY, rows) if rows else []
+    return {row: aid for row, aid in zip(rows, found) if aid is not None}
+
+
+def _profile_query(topics: Dict[str, float], keywords: Dict[str, float], idf: np.ndarray) -> np.ndarray:
+    texts = [(kw, float(w)) for kw, w in keywords.items()]
+    texts += [(topic, float(w) * KEYWORD_BOOST) for topic, w in topics.items()]
+    return _to_vector(hashed_counts(texts, len(idf)), idf, log_tf=False)
+
+
+def _top_rows(scores: np.ndarray, k: int) -> List[int]:
+    candidates = np.flatnonzero(scores > 0)
+    if candidates.size > k:
+        candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+    return candidates[np.argsort(scores[candidates])[::-1]].tolist()
+
+
+def _rank_block(store: ArticleVectorStore, queries: np.ndarray, n_rows: int, k: int) -> List[List[Tuple[int, float]]]:
+    # numpy releases the GIL for the product, so this runs in a thread off the event loop
+    scores = store.scores(queries, n_rows)
+    return [
+        [(row, float(scores[row, col])) for row in _top_rows(scores[:, col], k)]
+        for col in range(queries.shape[0])
+    ]
+
+
+async def rank_articles_many(
+    profiles: List[Tuple[Dict[str, float], Dict[str, float]]],
+    limit: int,
+) -> List[List[Tuple[str, float]]]:
+    """
+    rank_articles for several (topics, keywords) profiles at once: the profile vectors
+    are stacked and scored against the matrix in one product off the event loop, and
+    the winning rows of every profile are resolved with one Redis read.
+    """
+    if _store is None or not profiles:
+        return [[] for _ in profiles]
+
+    # Rows claimed so far (the ring covers the whole capacity once it has wrapped)
+    n_rows = min(int(await redis_client.get(NEXT_ROW_KEY) or 0), _store.capacity)
+    if not n_rows:
+        return [[] for _ in profiles]
+
+    idf = await _get_idf()
+    queries = np.stack([_profile_query(topics, keywords, idf) for topics, keywords in profiles])
+    active = np.flatnonzero(queries.any(axis=1))
+    if not active.size:
+        return [[] for _ in profiles]
+
+    # Extra headroom: rows of re-saved articles can map to the same id
+    blocks = await asyncio.to_thread(_rank_block, _store, queries[active], n_rows, limit * 2)
+
+    ids = await _ids_for_rows(sorted({row for block in blocks for row, _ in block}))
+    results: List[List[Tuple[str, float]]] = [[] for _ in profiles]
+    for position, block in zip(active.tolist(), blocks):
+        ranked, seen = results[position], set()
+        for row, score in block:
+            aid = ids.get(row)
+            if aid and aid not in seen:
+                seen.add(aid)
+                ranked.append((aid, score))
+                if len(ranked) == limit:
+                    break
+    return results
+
+
+async def rank_articles(topics: Dict[str, float], keywords: Dict[str, float], limit: int) -> List[Tuple[str, float]]:
+    """
+    Map a weighted profile into the article space and rank every stored article
+    with one mat-vec. Returns [(article_id, cosine)] best first.
+    """
+    return (await rank_articles_many([(topics, keywords)], limit))[0]
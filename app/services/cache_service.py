@@ -0,0 +1,129 @@
+from app.core.config import settings
+from app.database.redis_client import redis_client, pipeline_ops
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import time
+import uuid
+
+# In-process map of cache_key -> task for the build currently running in this worker
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Delete the lock only if we still own it (lease may have expired and been re-taken)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def lock_key_for(cache_key: str) -> str:
+    return f"lock:{cache_key}"
+
+
+def stale_key_for(cache_key: str) -> str:
+    return f"stale:{cache_key}"
+
+
+async def load_payload(key: str) -> Optional[Any]:
+    cached = await redis_client.get(key)
+    if not cached:
+        return None
+    try:
+        return json.loads(cached)
+    except json.JSONDecodeError:
+        # Corrupted entry - treat as a miss
+        return None
+
+
+async def store_payload(cache_key: str, ttl: int, payload: Any):
+    """Write the fresh payload plus a longer-lived stale copy served while rebuilding"""
+    data = json.dumps(payload)
+    await pipeline_ops([
+        ("setex", cache_key, ttl, data),
+        ("setex", stale_key_for(cache_key), settings.CACHE_STALE_TTL, data),
+    ])
+
+
+async def acquire_lock(cache_key: str, lease_seconds: Optional[int] = None) -> Optional[str]:
+    """Cross-worker build lock with lease expiry. Returns the owner token or None."""
+    token = uuid.uuid4().hex
+    lease = lease_seconds or settings.CACHE_LOCK_LEASE_SECONDS
+    if await redis_client.set(lock_key_for(cache_key), token, nx=True, ex=lease):
+        return token
+    return None
+
+
+async def release_lock(cache_key: str, token: str):
+    try:
+        await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key_for(cache_key), token)
+    except Exception as e:
+        print(f"Failed to release lock for {cache_key}: {e}")
+
+
+async def _build_across_workers(cache_key: str, ttl: int, builder: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+    token = await acquire_lock(cache_key)
+
+    if token is None:
+        # Another worker is building - serve the previous payload if we have one
+        stale = await load_payload(stale_key_for(cache_key))
+        if stale is not None:
+            return stale, "stale"
+
+        # Otherwise wait for the other worker's result
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_SECONDS)
+            payload = await load_payload(cache_key)
+            if payload is not None:
+                return payload, "cache"
+            if not await redis_client.exists(lock_key_for(cache_key)):
+                break  # builder finished without a result (failed) or lease expired
+
+        # Take over the build ourselves
+        token = await acquire_lock(cache_key)
+
+    try:
+        payload = await builder()
+        await store_payload(cache_key, ttl, payload)
+        return payload, "api"
+    finally:
+        if token:
+            await release_lock(cache_key, token)
+
+
+async def get_or_build(cache_key: str, ttl: int, builder: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+    """
+    Single-flight cache read.
+    Returns (payload, source) where source is cache / api / stale / coalesced.
+    Only one builder runs per key: in-process via a shared task,
+    across workers via a Redis lock with lease expiry.
+    """
+    payload = await load_payload(cache_key)
+    if payload is not None:
+        return payload, "cache"
+
+    task = _inflight.get(cache_key)
+    if task is not None:
+        # A build is already running in this worker
+        stale = await load_payload(stale_key_for(cache_key))
+        if stale is not None:
+            return stale, "stale"
+        payload, _ = await asyncio.shield(task)
+        return payload, "coalesced"
+
+    # The build runs as its own task so a disconnected caller doesn't cancel it for everyone
+    task = asyncio.create_task(_build_across_workers(cache_key, ttl, builder))
+    _inflight[cache_key] = task
+    task.add_done_callback(lambda t: _finish_build(cache_key, t))
+
+    return await asyncio.shield(task)
+
+
+def _finish_build(cache_key: str, task: asyncio.Task):
+    if _inflight.get(cache_key) is task:
+        _inflight.pop(cache_key, None)
+    # Mark failures as retrieved so a build nobody awaited doesn't log a warning
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,529 @@
+from app.core.config import settings
+from app.services.ann_index import LSHIndex
+from app.utils.profile_keys import decode_weights
+from scipy import sparse
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import asyncio
+import time
+
+
+class CollabEngine:
+    """
+    User x keyword sparse matrix (CSR, float32) with L2-normalized rows.
+    Cosine similarity against every user is a single sparse mat-vec.
+
+    Rows changed after the build live in `overlay` (row -> normalized 1 x V vector)
+    and override the CSR row when scoring. An optional LSH index narrows the
+    candidates before exact re-ranking.
+
+    Per-user top-k lists are cached in `neighbors` and maintained incrementally:
+    when one profile changes, only users sharing a keyword with it (found through
+    the keyword -> users postings) are re-scored.
+    """
+
+    def __init__(
+        self,
+        user_ids: List[str],
+        vocab: Dict[str, int],
+        matrix: sparse.csr_matrix,
+        norms: Optional[np.ndarray] = None,
+        neighbor_k: int = 50,
+    ):
+        self.user_ids = user_ids
+        self.user_index = {uid: i for i, uid in enumerate(user_ids)}
+        self.vocab = vocab
+        self.matrix = matrix
+        self.overlay: Dict[int, sparse.csr_matrix] = {}
+        self.ann: Optional[LSHIndex] = None
+        self.built_at = time.time()
+
+        # Raw L2 norm per row, so weight deltas can be applied to normalized rows
+        self.norms = norms if norms is not None else np.ones(len(user_ids), dtype=np.float32)
+
+        # Postings: CSC columns of the built matrix + sets for overlay rows
+        self.columns = matrix.tocsc()
+        self.overlay_postings: Dict[int, Set[int]] = {}
+
+        self.neighbor_k = neighbor_k
+        self.neighbors: Dict[int, Dict[int, float]] = {}
+        # Reverse lists (row -> rows whose list contains it) and the score a newcomer
+        # must beat to enter each cached list (inf = no cached list)
+        self.listed_in: Dict[int, Set[int]] = {}
+        self.floors = np.full(len(user_ids), np.inf, dtype=np.float32)
+
+    def enable_ann(self, n_tables: int, n_bits: int, n_probes: int) -> "CollabEngine":
+        self.ann = LSHIndex(n_tables=n_tables, n_bits=n_bits, n_probes=n_probes).build(self.matrix)
+        return self
+
+    @classmethod
+    def from_profiles(cls, profiles: List[Tuple[str, Dict[str, float]]], neighbor_k: int = 50) -> "CollabEngine":
+        vocab: Dict[str, int] = {}
+        user_ids: List[str] = []
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+
+        for user_id, keywords in profiles:
+            user_ids.append(user_id)
+            for kw, weight in (keywords or {}).items():
+                if not weight:
+                    continue
+                col = vocab.setdefault(kw, len(vocab))
+                indices.append(col)
+                data.append(weight)
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(user_ids), max(len(vocab), 1)),
+            dtype=np.float32,
+        )
+        matrix.sum_duplicates()
+        normalized, norms = _normalize_rows(matrix)
+        return cls(user_ids, vocab, normalized, norms=norms, neighbor_k=neighbor_k)
+
+    def vectorize(self, keywords: Dict[str, float]) -> Optional[sparse.csr_matrix]:
+        """
+        Map a keyword profile into the engine's space as a normalized 1 x V row.
+        Keywords outside the vocabulary still count towards the norm (true cosine).
+        """
+        norm = float(np.sqrt(sum(float(w) * float(w) for w in keywords.values())))
+        if not norm:
+            return None
+
+        cols, vals = [], []
+        for kw, weight in keywords.items():
+            col = self.vocab.get(kw)
+            if col is not None and weight:
+                cols.append(col)
+                vals.append(weight / norm)
+
+        return sparse.csr_matrix(
+            (np.asarray(vals, dtype=np.float32), (np.zeros(len(cols), dtype=np.int32), np.asarray(cols, dtype=np.int32))),
+            shape=(1, self.matrix.shape[1]),
+            dtype=np.float32,
+        )
+
+    def row_vector(self, row: int) -> sparse.csr_matrix:
+        return self.overlay.get(row, self.matrix[row])
+
+    def _ensure_row(self, user_id: str) -> int:
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.user_index[user_id] = row
+            self.matrix.resize((row + 1, self.matrix.shape[1]))
+            self.norms = np.append(self.norms, np.float32(0))
+            self.floors = np.append(self.floors, np.float32(np.inf))
+        return row
+
+    def upsert_user(self, user_id: str, keywords: Dict[str, float]) -> List[str]:
+        """
+        Insert or replace one user's row without rebuilding the matrix.
+        Returns the users whose cached neighbor lists changed (empty if the
+        profile is unchanged).
+        """
+        row = self._ensure_row(user_id)
+        weights = {}
+        for kw, weight in keywords.items():
+            if weight:
+                if kw not in self.vocab:
+                    self.vocab[kw] = len(self.vocab)
+                weights[self.vocab[kw]] = float(weight)
+        return self._set_row(row, weights)
+
+    def apply_delta(self, user_id: str, deltas: Dict[str, float]) -> List[str]:
+        """
+        Add keyword weight deltas (e.g. one interaction) to a user's row.
+        The raw weights are recovered from the normalized row and its cached norm.
+        """
+        row = self._ensure_row(user_id)
+        current = self.row_vector(row)
+        norm = float(self.norms[row])
+        weights = {int(c): float(v) * norm for c, v in zip(current.indices, current.data)}
+
+        for kw, delta in deltas.items():
+            col = self.vocab.setdefault(kw, len(self.vocab))
+            weights[col] = weights.get(col, 0.0) + float(delta)
+
+        return self._set_row(row, weights)
+
+    def _set_row(self, row: int, weights: Dict[int, float]) -> List[str]:
+        weights = {col: w for col, w in weights.items() if abs(w) > 1e-6}
+        if len(self.vocab) > self.matrix.shape[1]:
+            # Adding CSR columns only changes the shape - no data is copied
+            self.matrix.resize((self.matrix.shape[0], len(self.vocab)))
+
+        norm = float(np.sqrt(sum(w * w for w in weights.values())))
+        cols = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+        vals = np.fromiter(weights.values(), dtype=np.float32, count=len(weights)) / (norm or 1)
+        vector = sparse.csr_matrix(
+            (vals, (np.zeros(len(cols), dtype=np.int32), cols)),
+            shape=(1, self.matrix.shape[1]),
+            dtype=np.float32,
+        )
+
+        # The norm is what apply_delta rescales by, so it must track the raw weights
+        # even when the direction (and so every similarity) is unchanged
+        self.norms[row] = norm
+
+        old = self.row_vector(row)
+        if old.nnz == vector.nnz and np.allclose(_pad(old, vector.shape[1]).toarray(), vector.toarray(), atol=1e-6):
+            return []
+
+        old_cols = set(int(c) for c in old.indices)
+        for col in old_cols:
+            self.overlay_postings.get(col, set()).discard(row)
+        for col in cols:
+            self.overlay_postings.setdefault(int(col), set()).add(row)
+
+        self.overlay[row] = vector
+
+        if self.ann is not None:
+            self.ann.upsert(row, vector)
+
+        return self._refresh_neighbors(row, vector, old_cols | set(int(c) for c in cols))
+
+    def postings(self, cols: Iterable[int]) -> Optional[np.ndarray]:
+        """
+        Rows that currently have a non-zero weight for any of `cols`.
+        None when the postings cover most users (a full mat-vec is cheaper then).
+        """
+        found = []
+        built_cols = self.columns.shape[1]
+        for col in cols:
+            if col < built_cols:
+                lo, hi = self.columns.indptr[col], self.columns.indptr[col + 1]
+                found.append(self.columns.indices[lo:hi])
+            if col in self.overlay_postings:
+                found.append(np.fromiter(self.overlay_postings[col], dtype=np.int64))
+
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        if sum(len(f) for f in found) > len(self.user_ids) // 2:
+            return None
+
+        rows = np.unique(np.concatenate(found).astype(np.int64))
+        if self.overlay:
+            # Overlay rows only count through their overlay postings
+            overlay_rows = np.fromiter(self.overlay.keys(), dtype=np.int64)
+            stale = np.isin(rows, overlay_rows) & ~np.isin(rows, _overlay_members(self.overlay_postings, cols))
+            rows = rows[~stale]
+        return rows
+
+    def _refresh_neighbors(self, row: int, vector: sparse.csr_matrix, cols: Set[int]) -> List[str]:
+        """Re-score `row` against users sharing a keyword and patch the cached top-k lists"""
+        rows = self.postings(cols)
+        if rows is None:
+            scores = self._score(vector)
+            scores[row] = 0
+            rows = np.arange(len(scores))
+        else:
+            rows = rows[rows != row]
+            scores = self._score(vector, rows) if rows.size else np.empty(0, dtype=np.float32)
+
+        top = self._select_top(scores, self.neighbor_k, rows) if vector.nnz else []
+        self._store_neighbors(row, {self.user_index[uid]: sim for uid, sim in top})
+
+        # Lists this user may enter (beats the floor) or is already part of
+        listed = self.listed_in.get(row, set())
+        keep = (scores > self.floors[rows]) & (rows != row)
+        if listed:
+            keep |= np.isin(rows, np.fromiter(listed, dtype=np.int64, count=len(listed)))
+
+        changed = [self.user_ids[row]]
+        for other, sim in zip(rows[keep].tolist(), scores[keep].tolist()):
+            cached = self.neighbors.get(other)
+            if cached is None:
+                continue
+
+            updated = dict(cached)
+            previous = updated.pop(row, None)
+            full = len(cached) >= self.neighbor_k
+
+            if previous is not None and full and sim < previous:
+                # A user outside the list may now outrank this one - recompute lazily
+                self._drop_neighbors(other)
+            else:
+                if sim > 0:
+                    updated[row] = sim
+                    if len(updated) > self.neighbor_k:
+                        del updated[min(updated, key=updated.get)]
+                self._store_neighbors(other, updated)
+
+            changed.append(self.user_ids[other])
+
+        return changed
+
+    def _store_neighbors(self, row: int, neighbors: Dict[int, float]):
+        for other in self.neighbors.get(row, ()):
+            self.listed_in.get(other, set()).discard(row)
+        for other in neighbors:
+            self.listed_in.setdefault(other, set()).add(row)
+
+        self.neighbors[row] = neighbors
+        full = len(neighbors) >= self.neighbor_k
+        self.floors[row] = min(neighbors.values()) if full else 0
+
+    def _drop_neighbors(self, row: int):
+        for other in self.neighbors.pop(row, ()):
+            self.listed_in.get(other, set()).discard(row)
+        self.floors[row] = np.inf
+
+    def _score(self, vector: sparse.csr_matrix, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine of `vector` against all rows (or just `rows`), overlay rows included"""
+        # Dense query: sparse x dense mat-vec is much cheaper than sparse x sparse
+        query = _pad(vector, self.matrix.shape[1]).toarray().ravel()
+        base = self.matrix if rows is None else self.matrix[rows]
+        scores = base @ query
+
+        if self.overlay:
+            if rows is None:
+                for row, row_vec in self.overlay.items():
+                    scores[row] = (row_vec @ query[:row_vec.shape[1]])[0]
+            else:
+                overlay_rows = np.fromiter(self.overlay.keys(), dtype=np.int64, count=len(self.overlay))
+                for pos in np.flatnonzero(np.isin(rows, overlay_rows)):
+                    row_vec = self.overlay[int(rows[pos])]
+                    scores[pos] = (row_vec @ query[:row_vec.shape[1]])[0]
+
+        return scores
+
+    def top_k_for_vector(
+        self,
+        vector: sparse.csr_matrix,
+        k: int,
+        exclude: Optional[str] = None,
+        use_ann: Optional[bool] = None,
+    ) -> List[Tuple[str, float]]:
+        if vector is None or vector.nnz == 0 or not self.user_ids:
+            return []
+
+        use_ann = self.ann is not None if use_ann is None else (use_ann and self.ann is not None)
+        exclude_row = self.user_index.get(exclude) if exclude is not None else None
+
+        if use_ann:
+            # Approximate: exact cosine only for the LSH candidates
+            rows = self.ann.candidates(_pad(vector, self.matrix.shape[1]))
+            if exclude_row is not None:
+                rows = rows[rows != exclude_row]
+            if rows.size == 0:
+                return []
+            scores = self._score(vector, rows)
+            return self._select_top(scores, k, rows)
+
+        scores = self._score(vector)
+        if exclude_row is not None:
+            scores[exclude_row] = 0
+
+        return self._select_top(scores, k)
+
+    def top_k(self, user_id: str, k: int, keywords: Optional[Dict[str, float]] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k most similar users. Pass `keywords` to score the user's current
+        profile (e.g. a user created after the last build).
+        """
+        if keywords is not None:
+            return self.top_k_for_vector(self.vectorize(keywords), k, exclude=user_id)
+
+        row = self.user_index.get(user_id)
+        if row is None:
+            return []
+
+        if k <= self.neighbor_k:
+            cached = self.neighbors.get(row)
+            if cached is None:
+                top = self.top_k_for_vector(self.row_vector(row), self.neighbor_k, exclude=user_id)
+                cached = {self.user_index[uid]: sim for uid, sim in top}
+                self._store_neighbors(row, cached)
+            ordered = sorted(cached.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self.user_ids[r], sim) for r, sim in ordered]
+
+        return self.top_k_for_vector(self.row_vector(row), k, exclude=user_id)
+
+    def top_k_all(self, k: int, batch_size: int = 1024) -> Dict[str, List[Tuple[str, float]]]:
+        """Neighbors for every user, computed block by block to bound memory"""
+        results = {}
+        current = self._current_matrix()
+        transposed = current.T.tocsr()
+
+        for start in range(0, len(self.user_ids), batch_size):
+            end = min(start + batch_size, len(self.user_ids))
+            # Sparse result: only users sharing at least one keyword are materialized
+            block = (current[start:end] @ transposed).tocsr()
+
+            for offset in range(end - start):
+                row = start + offset
+                lo, hi = block.indptr[offset], block.indptr[offset + 1]
+                cols, vals = block.indices[lo:hi], block.data[lo:hi]
+
+                keep = (vals > 0) & (cols != row)
+                cols, vals = cols[keep], vals[keep]
+
+                if cols.size > k:
+                    part = np.argpartition(vals, -k)[-k:]
+                    cols, vals = cols[part], vals[part]
+
+                order = np.argsort(vals)[::-1]
+                results[self.user_ids[row]] = [(self.user_ids[c], float(v)) for c, v in zip(cols[order], vals[order])]
+
+        return results
+
+    def _current_matrix(self) -> sparse.csr_matrix:
+        """The built matrix with overlay rows swapped in (what `_score` sees row by row)"""
+        if not self.overlay:
+            return self.matrix
+
+        n_rows, n_columns = self.matrix.shape
+        keep = np.ones(n_rows, dtype=np.float32)
+        overlay_rows = np.fromiter(self.overlay.keys(), dtype=np.int64, count=len(self.overlay))
+        keep[overlay_rows] = 0
+        base = sparse.diags(keep, format="csr") @ self.matrix
+
+        replaced = sparse.vstack([_pad(self.overlay[int(row)], n_columns) for row in overlay_rows], format="coo")
+        overlay = sparse.csr_matrix(
+            (replaced.data, (overlay_rows[replaced.row], replaced.col)),
+            shape=(n_rows, n_columns),
+            dtype=np.float32,
+        )
+        return (base + overlay).tocsr()
+
+    def _select_top(self, scores: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Top-k positive scores; `rows` maps score positions to matrix rows (identity if None)"""
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+
+        if candidates.size > k:
+            part = np.argpartition(scores[candidates], -k)[-k:]
+            candidates = candidates[part]
+
+        ordered = candidates[np.argsort(scores[candidates])[::-1]]
+        row_ids = ordered if rows is None else rows[ordered]
+        return [(self.user_ids[r], float(scores[i])) for r, i in zip(row_ids, ordered)]
+
+
+def _pad(vector: sparse.csr_matrix, n_columns: int) -> sparse.csr_matrix:
+    # Rows built before the vocabulary grew are narrower than the matrix
+    if vector.shape[1] < n_columns:
+        vector = vector.copy()
+        vector.resize((1, n_columns))
+    return vector
+
+
+def _overlay_members(overlay_postings: Dict[int, Set[int]], cols: Iterable[int]) -> np.ndarray:
+    members = set()
+    for col in cols:
+        members.update(overlay_postings.get(col, ()))
+    return np.fromiter(members, dtype=np.int64, count=len(members))
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()).astype(np.float32)
+    safe = norms.copy()
+    safe[safe == 0] = 1
+    normalized = sparse.csr_matrix(sparse.diags(1 / safe).astype(np.float32) @ matrix, dtype=np.float32)
+    return normalized, norms
+
+
+# -------------------- App-lifetime engine --------------------
+_engine: Optional[CollabEngine] = None
+_build_lock = asyncio.Lock()
+_rebuild_task: Optional[asyncio.Task] = None
+
+# Users updated while a rebuild was reading profiles - re-applied to the new engine
+_touched_during_build: Set[str] = set()
+
+
+async def build_collab_engine(profiles_collection) -> CollabEngine:
+    """Stream every profile (no cap) and build the sparse engine off the event loop"""
+    started = time.perf_counter()
+    profiles = []
+
+    cursor = profiles_collection.find({}, {"_id": 0, "user_id": 1, "keywords": 1}).batch_size(2000)
+    async for doc in cursor:
+        profiles.append((doc["user_id"], decode_weights(doc.get("keywords"))))
+
+    engine = await asyncio.to_thread(CollabEngine.from_profiles, profiles, settings.COLLAB_TOP_K)
+    if settings.COLLAB_ANN_ENABLED:
+        await asyncio.to_thread(
+            engine.enable_ann,
+            settings.COLLAB_ANN_TABLES,
+            settings.COLLAB_ANN_BITS,
+            settings.COLLAB_ANN_PROBES,
+        )
+    print(
+        f"🧮 Collab engine built: {len(engine.user_ids)} users x {len(engine.vocab)} keywords "
+        f"({engine.matrix.nnz} nnz, ann={'on' if engine.ann else 'off'}) in {time.perf_counter() - started:.2f}s"
+    )
+    return engine
+
+
+async def _rebuild(profiles_collection, only_if_missing: bool = False):
+    global _engine
+    async with _build_lock:
+        # Concurrent first callers queue on the lock - only the first one builds
+        if only_if_missing and _engine is not None:
+            return
+        _touched_during_build.clear()
+        try:
+            engine = await build_collab_engine(profiles_collection)
+
+            # The cursor may have read some profiles before their latest interaction
+            touched = list(_touched_during_build)
+            if touched:
+                cursor = profiles_collection.find({"user_id": {"$in": touched}}, {"_id": 0, "user_id": 1, "keywords": 1})
+                async for doc in cursor:
+                    engine.upsert_user(doc["user_id"], decode_weights(doc.get("keywords")))
+
+            _engine = engine
+        except Exception as e:
+            print(f"Collab engine rebuild failed: {e}")
+        finally:
+            _touched_during_build.clear()
+
+
+async def get_collab_engine(profiles_collection) -> Optional[CollabEngine]:
+    """
+    Current engine. The first call builds it; afterwards an engine older than
+    COLLAB_ENGINE_REFRESH_SECONDS keeps serving while a rebuild runs in the background.
+    """
+    global _rebuild_task
+
+    if _engine is None:
+        await _rebuild(profiles_collection, only_if_missing=True)
+        return _engine
+
+    stale = time.time() - _engine.built_at >= settings.COLLAB_ENGINE_REFRESH_SECONDS
+    if stale and (_rebuild_task is None or _rebuild_task.done()):
+        _rebuild_task = asyncio.create_task(_rebuild(profiles_collection))
+
+    return _engine
+
+
+def update_collab_user(user_id: str, keyword_deltas: Dict[str, float]) -> List[str]:
+    """
+    Apply one interaction's keyword deltas to the live engine.
+    Returns the users whose neighbor lists changed. A no-op until the engine is built;
+    other workers pick the change up when they next serve this user or rebuild.
+    """
+    if _build_lock.locked():
+        _touched_during_build.add(user_id)
+
+    if _engine is None or not keyword_deltas:
+        return []
+
+    return _engine.apply_delta(user_id, keyword_deltas)
+
+
+def set_collab_user(user_id: str, keywords: Dict[str, float]) -> List[str]:
+    """Replace a user's whole row on the live engine (e.g. after their profile was compacted)"""
+    if _build_lock.locked():
+        _touched_during_build.add(user_id)
+
+    if _engine is None:
+        return []
+
+    return _engine.upsert_user(user_id, keywords)
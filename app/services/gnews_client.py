@@ -0,0 +1,259 @@
+from app.core.config import settings
+from app.database.redis_client import redis_client
+from app.services.cache_service import get_or_build, store_payload
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlencode
+import asyncio
+import random
+import time
+import httpx
+
+BASE_URL = "https://gnews.io/api/v4"
+
+# Statuses worth retrying (rate limited / upstream trouble)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+BOOLEAN_OPERATORS = {"AND", "OR", "NOT"}
+
+# App-lifetime HTTP client (created on startup, closed on shutdown)
+_client: Optional[httpx.AsyncClient] = None
+
+
+class GNewsError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Per-process fallback for when Redis is unreachable (then each worker gets the full rate)
+_bucket = TokenBucket(settings.GNEWS_RATE_PER_SECOND, settings.GNEWS_BURST)
+
+# Shared rate window: count this window's requests, expiring the counter with the window.
+# KEYS: window counter   ARGV: ttl in ms
+_RATE_WINDOW_SCRIPT = """
+local used = redis.call('incr', KEYS[1])
+if used == 1 then
+    redis.call('pexpire', KEYS[1], ARGV[1])
+end
+return used
+"""
+
+
+async def init_gnews_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=httpx.Timeout(settings.GNEWS_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=settings.GNEWS_MAX_CONNECTIONS),
+        )
+        print("[+] GNews client ready")
+
+
+async def close_gnews_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        print("[-] GNews client closed")
+
+
+def _get_client() -> httpx.AsyncClient:
+    # Lazily create the client if startup hook did not run (scripts, shells)
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=BASE_URL, timeout=httpx.Timeout(settings.GNEWS_TIMEOUT_SECONDS))
+    return _client
+
+
+async def _acquire_rate_slot():
+    """
+    Rate limit shared by every worker and host: at most GNEWS_BURST requests per window
+    of GNEWS_BURST / GNEWS_RATE_PER_SECOND seconds, counted in Redis. Callers over the
+    limit wait for the next window. Falls back to the per-process bucket if Redis fails.
+    """
+    window = settings.GNEWS_BURST / settings.GNEWS_RATE_PER_SECOND
+    ttl_ms = int(window * 2000) + 1000
+    while True:
+        now = time.time()
+        slot = int(now // window)
+        try:
+            used = await redis_client.eval(_RATE_WINDOW_SCRIPT, 1, f"gnews:rate:{slot}", ttl_ms)
+        except Exception as e:
+            print(f"GNews rate limiting via Redis failed, using the local limit: {e}")
+            await _bucket.acquire()
+            return
+
+        if used <= settings.GNEWS_BURST:
+            return
+        # Jitter spreads the waiting workers over the start of the next window
+        await asyncio.sleep((slot + 1) * window - now + random.uniform(0, window / 10))
+
+
+def _quota_key() -> str:
+    return f"gnews:quota:{datetime.now(timezone.utc):%Y%m%d}"
+
+
+async def remaining_daily_quota() -> Optional[int]:
+    """Requests left today across all workers (None when unlimited or unknown)"""
+    if settings.GNEWS_DAILY_QUOTA <= 0:
+        return None
+    try:
+        used = await redis_client.get(_quota_key())
+    except Exception as e:
+        print(f"GNews quota lookup failed: {e}")
+        return None
+    return settings.GNEWS_DAILY_QUOTA - int(used or 0)
+
+
+async def _consume_daily_quota():
+    if settings.GNEWS_DAILY_QUOTA <= 0:
+        return
+
+    quota_key = _quota_key()
+    try:
+        used = await redis_client.incr(quota_key)
+        if used == 1:
+            await redis_client.expire(quota_key, 2 * 24 * 3600)
+    except Exception as e:
+        # Don't take GNews down with Redis - just skip the accounting
+        print(f"GNews quota accounting failed: {e}")
+        return
+
+    if used > settings.GNEWS_DAILY_QUOTA:
+        raise GNewsError("GNews daily quota exhausted", status_code=429)
+
+
+def normalize_params(params: dict) -> dict:
+    """Drop unset params and canonicalize the query so equivalent lookups share a cache entry"""
+    normalized = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if key == "q":
+            # Collapse whitespace and case, keep GNews boolean operators intact
+            value = " ".join(w if w in BOOLEAN_OPERATORS else w.lower() for w in str(value).split())
+        elif isinstance(value, str):
+            value = value.strip().lower()
+        normalized[key] = value
+    return normalized
+
+
+def query_cache_key(endpoint: str, params: dict) -> str:
+    return f"gnews:{endpoint}:{urlencode(sorted(params.items()))}"
+
+
+async def _fetch(endpoint: str, params: dict) -> dict:
+    """
+    GET a GNews endpoint with rate limiting, quota accounting and bounded retries.
+    Raises GNewsError when the request ultimately fails.
+    """
+    query = dict(params)
+    query["apikey"] = settings.NEWS_API_KEY
+
+    last_error = "unknown error"
+    last_status = None
+
+    for attempt in range(settings.GNEWS_MAX_RETRIES + 1):
+        if attempt:
+            # Exponential backoff with jitter
+            delay = settings.GNEWS_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+        await _acquire_rate_slot()
+        await _consume_daily_quota()
+
+        try:
+            response = await _get_client().get(f"/{endpoint}", params=query)
+        except httpx.HTTPError as e:
+            last_error, last_status = str(e) or type(e).__name__, None
+            continue
+
+        if response.status_code in RETRY_STATUSES:
+            last_error, last_status = f"GNews returned {response.status_code}", response.status_code
+            continue
+
+        if response.status_code >= 400:
+            raise GNewsError(f"GNews returned {response.status_code}: {response.text[:200]}", response.status_code)
+
+        try:
+            return response.json()
+        except ValueError:
+            raise GNewsError("GNews returned invalid JSON", response.status_code)
+
+    raise GNewsError(f"GNews request failed after retries: {last_error}", last_status)
+
+
+async def gnews_request(endpoint: str, params: dict, refresh: bool = False) -> dict:
+    """
+    Cached GNews lookup keyed by endpoint + normalized params.
+    Concurrent misses for the same query share one upstream call.
+    refresh=True skips the cache read but still writes the fresh result through.
+    """
+    query = normalize_params(params)
+
+    if settings.GNEWS_CACHE_TTL <= 0:
+        return await _fetch(endpoint, query)
+
+    cache_key = query_cache_key(endpoint, query)
+
+    if refresh:
+        data = await _fetch(endpoint, query)
+        await store_payload(cache_key, settings.GNEWS_CACHE_TTL, data)
+        return data
+
+    data, _ = await get_or_build(cache_key, settings.GNEWS_CACHE_TTL, lambda: _fetch(endpoint, query))
+    return data
+
+
+async def search(
+    query: str,
+    lang: str = "en",
+    country: Optional[str] = "in",
+    max_results: int = 10,
+    refresh: bool = False,
+) -> dict:
+    return await gnews_request(
+        "search",
+        {"q": query, "lang": lang, "country": country, "max": max_results},
+        refresh=refresh,
+    )
+
+
+async def top_headlines(
+    category: Optional[str] = None,
+    lang: str = "en",
+    country: Optional[str] = "in",
+    max_results: Optional[int] = None,
+    refresh: bool = False,
+) -> dict:
+    return await gnews_request(
+        "top-headlines",
+        {"category": category, "lang": lang, "country": country, "max": max_results},
+        refresh=refresh,
+    )
@@ -0,0 +1,180 @@
+from app.core.config import settings
+from app.api.v1.models.interaction_model import insert_interactions, apply_profile_deltas
+from bson import ObjectId
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import time
+
+# Background flusher and its queue (one per worker process)
+_queue: Optional[asyncio.Queue] = None
+_task: Optional[asyncio.Task] = None
+_wake: Optional[asyncio.Event] = None
+_stopping = False
+
+_metrics = {
+    "flushes": 0,
+    "events_flushed": 0,
+    "events_failed": 0,
+    "events_dropped": 0,
+    "profile_failures": 0,
+    "retries": 0,
+    "queue_full": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+    "total_flush_ms": 0.0,
+    "last_batch_size": 0,
+}
+
+
+def buffer_active() -> bool:
+    return _task is not None and not _stopping
+
+
+def enqueue_interaction(data: dict) -> bool:
+    """
+    Queue an interaction for the next flush. Returns False when the buffer is off
+    or full - the caller then writes synchronously (backpressure instead of dropping).
+    Queued events are only dropped when every flush attempt fails.
+    """
+    if not buffer_active():
+        return False
+    try:
+        _queue.put_nowait(data)
+    except asyncio.QueueFull:
+        _metrics["queue_full"] += 1
+        return False
+
+    if _queue.qsize() >= settings.INTERACTION_FLUSH_MAX_EVENTS:
+        _wake.set()
+    return True
+
+
+def _drain(limit: int) -> List[dict]:
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    return batch
+
+
+async def _with_retries(step: Callable[[], Awaitable], label: str, size: int):
+    """Run one flush step, retrying transient failures with exponential backoff"""
+    attempts = max(1, settings.INTERACTION_FLUSH_ATTEMPTS)
+    for attempt in range(1, attempts + 1):
+        try:
+            return await step()
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = settings.INTERACTION_FLUSH_BACKOFF_MS / 1000 * 2 ** (attempt - 1)
+            _metrics["retries"] += 1
+            print(f"⚠️ Interaction flush {label} failed for {size} events (attempt {attempt}/{attempts}), retrying in {delay:.2f}s: {e}")
+            await asyncio.sleep(delay)
+
+
+async def _flush_batch(batch: List[dict]):
+    started = time.perf_counter()
+    failed = 0
+    try:
+        # Retried inserts are idempotent (events keep their _id), so only the events that
+        # never got stored are lost if every attempt fails
+        errors = await _with_retries(lambda: insert_interactions(batch), "insert", len(batch))
+        stored = [event for event, error in zip(batch, errors) if error is None]
+        failed = len(batch) - len(stored)
+        if failed:
+            print(f"🚨 Dropping {failed} interactions rejected by the database: {next(e for e in errors if e)}")
+
+        # The batch id makes the $inc upserts idempotent, so retrying after a partial
+        # or ambiguous failure never applies a user's increments twice
+        batch_id = str(ObjectId())
+        try:
+            await _with_retries(lambda: apply_profile_deltas(stored, batch_id), "profile update", len(stored))
+        except Exception as e:
+            # The interactions are stored; profiles miss them until they are recomputed
+            _metrics["profile_failures"] += len(stored)
+            print(f"🚨 Profile update for {len(stored)} stored interactions failed after every attempt: {e}")
+    except Exception as e:
+        failed = len(batch)
+        print(f"🚨 Dropping {len(batch)} queued interactions after {settings.INTERACTION_FLUSH_ATTEMPTS} attempts: {e}")
+    _metrics["events_dropped"] += failed
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _metrics["flushes"] += 1
+    _metrics["events_flushed"] += len(batch) - failed
+    _metrics["events_failed"] += failed
+    _metrics["last_flush_ms"] = round(elapsed_ms, 2)
+    _metrics["max_flush_ms"] = round(max(_metrics["max_flush_ms"], elapsed_ms), 2)
+    _metrics["total_flush_ms"] += elapsed_ms
+    _metrics["last_batch_size"] = len(batch)
+
+
+async def flush_interactions():
+    """Write everything currently queued, in batches of INTERACTION_FLUSH_MAX_EVENTS"""
+    if _queue is None:
+        return
+    while True:
+        batch = _drain(max(1, settings.INTERACTION_FLUSH_MAX_EVENTS))
+        if not batch:
+            return
+        await _flush_batch(batch)
+
+
+async def _flush_loop():
+    interval = settings.INTERACTION_FLUSH_INTERVAL_MS / 1000
+    print(f"[+] Interaction write-behind buffer started (every {settings.INTERACTION_FLUSH_INTERVAL_MS}ms or {settings.INTERACTION_FLUSH_MAX_EVENTS} events)")
+    while not _stopping:
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        await flush_interactions()
+
+
+def start_interaction_buffer():
+    global _queue, _task, _wake, _stopping
+    if settings.INTERACTION_WRITE_BEHIND_ENABLED and _task is None:
+        _queue = asyncio.Queue(maxsize=max(1, settings.INTERACTION_BUFFER_CAPACITY))
+        _wake = asyncio.Event()
+        _stopping = False
+        _task = asyncio.create_task(_flush_loop())
+
+
+async def stop_interaction_buffer():
+    """Stop accepting events and flush whatever is still queued (shutdown)"""
+    global _task, _stopping
+    if _task is None:
+        return
+
+    _stopping = True
+    _wake.set()
+    try:
+        await _task
+    except Exception as e:
+        print(f"Interaction flusher exited with error: {e}")
+    # Events queued during the final flush
+    await flush_interactions()
+    _task = None
+    print(f"[-] Interaction buffer stopped ({_metrics['events_flushed']} events written)")
+
+
+def interaction_buffer_metrics() -> dict:
+    flushes = _metrics["flushes"]
+    return {
+        "enabled": buffer_active(),
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "capacity": _queue.maxsize if _queue is not None else settings.INTERACTION_BUFFER_CAPACITY,
+        "flushes": flushes,
+        "events_flushed": _metrics["events_flushed"],
+        "events_failed": _metrics["events_failed"],
+        "events_dropped": _metrics["events_dropped"],
+        "profile_failures": _metrics["profile_failures"],
+        "retries": _metrics["retries"],
+        "queue_full": _metrics["queue_full"],
+        "last_batch_size": _metrics["last_batch_size"],
+        "last_flush_ms": _metrics["last_flush_ms"],
+        "avg_flush_ms": round(_metrics["total_flush_ms"] / flushes, 2) if flushes else 0.0,
+        "max_flush_ms": _metrics["max_flush_ms"],
+    }
@@ -0,0 +1,234 @@
+from app.core.config import settings
+from app.database.redis_client import redis_client
+from app.services.cache_service import acquire_lock, release_lock
+from app.api.v1.models.interaction_model import get_interactions_collection, SCORE_WEIGHTS
+from app.api.v1.models.item_model import save_item_neighbors, get_item_norms
+from bson import ObjectId
+from datetime import timedelta
+from scipy import sparse
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import asyncio
+import time
+
+WATERMARK_KEY = "item_cf:watermark"
+FULL_BUILD_KEY = "item_cf:full_built_at"
+LOCK_NAME = "item_cf:index"
+
+# Background task handle (one per worker process)
+_task: Optional[asyncio.Task] = None
+
+
+def compute_item_neighbors(
+    interactions: Iterable[Tuple[str, str, str]],
+    n: int,
+    targets: Optional[Set[str]] = None,
+    known_norms: Optional[Dict[str, float]] = None,
+    batch_size: int = 1024,
+) -> Dict[str, Tuple[float, List[Tuple[str, float]]]]:
+    """
+    Item-item cosine over SCORE_WEIGHTS-weighted (user, article) engagement.
+    Returns {article_id: (norm, top-n [(neighbor_id, score)])} for `targets` (all if None).
+
+    For an incremental update the interactions only cover users near the targets,
+    so norms of other articles come from `known_norms` (the stored table).
+    """
+    weights: Dict[Tuple[str, str], float] = {}
+    for user_id, article_id, interaction_type in interactions:
+        key = (user_id, article_id)
+        weights[key] = weights.get(key, 0) + SCORE_WEIGHTS.get(interaction_type, 1)
+
+    user_index: Dict[str, int] = {}
+    article_index: Dict[str, int] = {}
+    rows, cols, vals = [], [], []
+    for (user_id, article_id), weight in weights.items():
+        # Only positive engagement counts as "liked together"
+        if weight <= 0:
+            continue
+        rows.append(user_index.setdefault(user_id, len(user_index)))
+        cols.append(article_index.setdefault(article_id, len(article_index)))
+        vals.append(weight)
+
+    if not article_index:
+        return {}
+
+    article_ids = list(article_index)
+    matrix = sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float32), (np.asarray(rows), np.asarray(cols))),
+        shape=(len(user_index), len(article_ids)),
+        dtype=np.float32,
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+
+    target_cols = np.arange(len(article_ids)) if targets is None else np.asarray(
+        sorted(article_index[a] for a in targets if a in article_index), dtype=np.int64
+    )
+    if known_norms:
+        is_target = np.zeros(len(article_ids), dtype=bool)
+        is_target[target_cols] = True
+        for article_id, norm in known_norms.items():
+            col = article_index.get(article_id)
+            if col is not None and not is_target[col] and norm:
+                norms[col] = norm
+
+    safe_norms = norms.copy()
+    safe_norms[safe_norms == 0] = 1
+    by_article = matrix.T.tocsr()
+
+    results = {}
+    for start in range(0, len(target_cols), batch_size):
+        block_cols = target_cols[start:start + batch_size]
+        # Sparse co-occurrence: only articles sharing a user are materialized
+        block = (by_article[block_cols] @ matrix).tocsr()
+
+        for offset, col in enumerate(block_cols):
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            others, scores = block.indices[lo:hi], block.data[lo:hi]
+            scores = scores / (safe_norms[col] * safe_norms[others])
+
+            keep = (others != col) & (scores > 0)
+            others, scores = others[keep], scores[keep]
+            if others.size > n:
+                part = np.argpartition(scores, -n)[-n:]
+                others, scores = others[part], scores[part]
+
+            order = np.argsort(scores)[::-1]
+            results[article_ids[col]] = (
+                float(norms[col]),
+                [(article_ids[o], float(s)) for o, s in zip(others[order], scores[order])],
+            )
+
+    return results
+
+
+async def _load_interactions(query: dict) -> List[Tuple[str, str, str]]:
+    cursor = get_interactions_collection().find(
+        query, {"_id": 0, "user_id": 1, "article_id": 1, "interaction_type": 1}
+    ).batch_size(5000)
+    return [
+        (doc["user_id"], doc["article_id"], doc.get("interaction_type", "view"))
+        async for doc in cursor
+        if doc.get("article_id")
+    ]
+
+
+async def full_rebuild() -> int:
+    interactions = get_interactions_collection()
+    latest = await interactions.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if latest is None:
+        return 0
+
+    loaded = await _load_interactions({"_id": {"$lte": latest["_id"]}})
+    rows = await asyncio.to_thread(compute_item_neighbors, loaded, settings.ITEM_CF_NEIGHBORS)
+    saved = await save_item_neighbors(rows)
+
+    await redis_client.set(WATERMARK_KEY, str(latest["_id"]))
+    await redis_client.set(FULL_BUILD_KEY, int(time.time()))
+    return saved
+
+
+async def _update_for_users(users: List[str], upto: ObjectId) -> int:
+    """Recompute every article in the history of `users` (their co-occurrence changed)"""
+    interactions = get_interactions_collection()
+    affected = set(await interactions.distinct("article_id", {"user_id": {"$in": users}}))
+    neighbors_of_affected = await interactions.distinct("user_id", {"article_id": {"$in": list(affected)}})
+    loaded = await _load_interactions({"user_id": {"$in": neighbors_of_affected}, "_id": {"$lte": upto}})
+
+    others = list({article_id for _, article_id, _ in loaded} - affected)
+    known_norms = await get_item_norms(others)
+
+    rows = await asyncio.to_thread(
+        compute_item_neighbors, loaded, settings.ITEM_CF_NEIGHBORS, affected, known_norms
+    )
+    return await save_item_neighbors(rows)
+
+
+async def incremental_update(watermark: ObjectId) -> int:
+    """
+    Recompute only the articles whose co-occurrence changed since `watermark`.
+
+    ObjectIds are generated by the writing worker, so they are not monotonic across
+    processes (clock skew, inserts in flight). Each cycle re-reads an overlap of
+    ITEM_CF_WATERMARK_OVERLAP_SECONDS before the watermark - recomputing an article
+    twice is harmless. New interactions are processed in batches of ITEM_CF_INCREMENTAL_BATCH.
+    """
+    interactions = get_interactions_collection()
+    overlap = timedelta(seconds=settings.ITEM_CF_WATERMARK_OVERLAP_SECONDS)
+    since = ObjectId.from_datetime(watermark.generation_time - overlap)
+    batch_size = max(1, settings.ITEM_CF_INCREMENTAL_BATCH)
+
+    saved = 0
+    while True:
+        new = await interactions.find(
+            {"_id": {"$gt": since}}, {"_id": 1, "user_id": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not new:
+            break
+
+        users = list({doc["user_id"] for doc in new})
+        saved += await _update_for_users(users, new[-1]["_id"])
+
+        since = new[-1]["_id"]
+        # Never move the watermark backwards (the overlap starts before it)
+        if since > watermark:
+            watermark = since
+            await redis_client.set(WATERMARK_KEY, str(watermark))
+        if len(new) < batch_size:
+            break
+
+    return saved
+
+
+async def run_item_index_update() -> Optional[int]:
+    """One update cycle, run by whichever worker holds the lock. Returns rows written."""
+    token = await acquire_lock(LOCK_NAME, lease_seconds=max(settings.ITEM_CF_REFRESH_SECONDS, 60))
+    if token is None:
+        return None
+
+    started = time.perf_counter()
+    try:
+        watermark, full_built_at = await redis_client.mget(WATERMARK_KEY, FULL_BUILD_KEY)
+        full_due = not full_built_at or time.time() - int(full_built_at) >= settings.ITEM_CF_FULL_REBUILD_SECONDS
+
+        if watermark is None or full_due:
+            saved = await full_rebuild()
+            mode = "full"
+        else:
+            saved = await incremental_update(ObjectId(watermark))
+            mode = "incremental"
+
+        if saved:
+            print(f"🔗 Item neighbors {mode} update: {saved} articles in {time.perf_counter() - started:.2f}s")
+        return saved
+    finally:
+        await release_lock(LOCK_NAME, token)
+
+
+async def _scheduler_loop():
+    print(f"[+] Item neighbor index scheduler started (every {settings.ITEM_CF_REFRESH_SECONDS}s)")
+    while True:
+        try:
+            await run_item_index_update()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Item neighbor update error: {e}")
+        await asyncio.sleep(settings.ITEM_CF_REFRESH_SECONDS)
+
+
+def start_item_index_scheduler():
+    global _task
+    if settings.ITEM_CF_ENABLED and _task is None:
+        _task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_item_index_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+        print("[-] Item neighbor index scheduler stopped")
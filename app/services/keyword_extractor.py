@@ -1,16 +1,37 @@
 from rake_nltk import Rake
+import threading
 import nltk
 
+
+def ensure_nltk_data():
+    """Download stopwords / punkt only if they are not installed yet"""
+    for resource, path in (("stopwords", "corpora/stopwords"), ("punkt", "tokenizers/punkt")):
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource, quiet=True)
+
+
 # Ensure stopwords data is available
-nltk.download("stopwords", quiet=True)
-nltk.download("punkt", quiet=True)
+ensure_nltk_data()
+
+# Rake keeps per-call state, so every thread gets its own instance
+_local = threading.local()
+
+
+def _get_rake() -> Rake:
+    rake = getattr(_local, "rake", None)
+    if rake is None:
+        rake = Rake()
+        _local.rake = rake
+    return rake
 
-rake = Rake()
 
 def extract_keywords(text: str, max_keywords: int = 5):
     if not text:
         return []
 
+    rake = _get_rake()
     rake.extract_keywords_from_text(text)
     keywords = rake.get_ranked_phrases()
 
@@ -0,0 +1,105 @@
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+# Compiled matchers kept per worker (most recently used users)
+MATCHER_CACHE_SIZE = 1024
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a profile's keywords (case-insensitive substrings).
+    `find` walks the text once, so matching cost is linear in the text length
+    no matter how many keywords the profile has.
+    """
+
+    def __init__(self, keywords: Dict[str, float]):
+        # Weights are looked up at match time, so they can change without a rebuild
+        self.keywords = dict(keywords)
+        self.terms = frozenset(self.keywords)
+        self._patterns: List[str] = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for kw in self.keywords:
+            pattern = kw.lower()
+            if pattern:
+                self._add(pattern, len(self._patterns))
+                self._patterns.append(kw)
+        self._link()
+
+    def _add(self, pattern: str, pattern_id: int):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _link(self):
+        # Breadth-first: a state's failure link points to its longest proper suffix in the trie
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[child] = link if link != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text: str) -> Dict[str, float]:
+        """{keyword: profile weight} for every keyword occurring in `text`"""
+        matches: Dict[str, float] = {}
+        if not self._patterns or not text:
+            return matches
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                kw = self._patterns[pattern_id]
+                matches[kw] = self.keywords[kw]
+        return matches
+
+
+_matchers: "OrderedDict[str, KeywordMatcher]" = OrderedDict()
+
+
+def get_profile_matcher(user_id: Optional[str], keywords: Dict[str, float]) -> KeywordMatcher:
+    """
+    Compiled matcher for a user's keyword profile, reused across requests.
+    The automaton depends only on the keyword set: a cached matcher is served while
+    the set is the same (weights change on every read as profiles decay) and picks
+    up the current weights. A set changed by another worker is recompiled here too.
+    """
+    if user_id is None:
+        return KeywordMatcher(keywords)
+
+    matcher = _matchers.get(user_id)
+    if matcher is not None and matcher.terms == keywords.keys():
+        matcher.keywords = dict(keywords)
+        _matchers.move_to_end(user_id)
+        return matcher
+
+    matcher = KeywordMatcher(keywords)
+    _matchers[user_id] = matcher
+    _matchers.move_to_end(user_id)
+    if len(_matchers) > MATCHER_CACHE_SIZE:
+        _matchers.popitem(last=False)
+    return matcher
+
+
+def invalidate_profile_matcher(user_id: str):
+    _matchers.pop(user_id, None)
@@ -1,35 +1,209 @@
-import httpx
+from fastapi import HTTPException
+from typing import Optional, List, Dict
 from app.core.config import settings
-from app.services.article_fetcher import fetch_full_article
+from app.api.v1.models.article_model import save_articles_bulk, get_enriched_articles, compute_content_hash
+from app.services.article_fetcher import fetch_full_articles
+from app.services.nlp_pool import summarize_and_extract
+from app.services import gnews_client
+from app.services.gnews_client import GNewsError
+from app.database.redis_client import pipeline_ops
+import time
 
-BASE_URL = "https://gnews.io/api/v4"
+VALID_CATEGORIES = [
+    "general", "world", "nation", "business", "technology",
+    "entertainment", "sports", "science", "health"
+]
+
+# Sorted set of topic -> request count (drives refresh-ahead topic selection).
+# Decayed and trimmed by the refresh scheduler so old or one-off topics fall out.
+TOPIC_HITS_KEY = "news:topic_hits"
+
+# Sorted set of cache key -> last request time (only recently requested entries are refreshed)
+REQUESTED_AT_KEY = "refresh:requested_at"
+
+
+async def record_cache_request(cache_key: str, topic: Optional[str] = None):
+    """Note a request for a refreshable cache entry (and count the topic's popularity)"""
+    ops = [("zadd", REQUESTED_AT_KEY, {cache_key: time.time()})]
+    if topic:
+        ops.append(("zincrby", TOPIC_HITS_KEY, 1, topic))
+    try:
+        await pipeline_ops(ops)
+    except Exception as e:
+        print(f"Request tracking failed for {cache_key}: {e}")
 
-async def fetch_news(query: str):
-    url = f"{BASE_URL}/search"
-    
-    params = {
-        "q": query,
-        "token": settings.NEWS_API_KEY,
-        "lang": "en",
-        "max": 10
-    }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        data = response.json()
+async def fetch_news(query: str):
+    try:
+        data = await gnews_client.search(query, country=None, max_results=10)
+    except GNewsError as e:
+        print(f"GNews search failed for '{query}': {e}")
+        return None
 
     if "errors" in data:
         return None
 
     articles = data.get("articles", [])
-    
-    # Enrich articles with full content
+
+    # Enrich articles with full content (fetched concurrently)
+    contents = await fetch_full_articles([article.get('url') for article in articles])
+
     for article in articles:
-        if article.get('url'):
-            full_text = await fetch_full_article(article['url'])
-            if full_text:
-                article['full_content'] = full_text  # Add new field
-            else:
-                article['full_content'] = article.get('content', '')  # Fallback to truncated
-    
-    return articles
\ No newline at end of file
+        full_text = contents.get(article.get('url'))
+        if full_text:
+            article['full_content'] = full_text  # Add new field
+        else:
+            article['full_content'] = article.get('content', '')  # Fallback to truncated
+
+    return articles
+
+
+# -------------------- Enrichment pipeline --------------------
+def get_raw_text(article: dict, full_content: Optional[str] = None) -> Optional[str]:
+    # Priority: full_content > content > description > title
+    return (
+        full_content
+        or article.get("content")
+        or article.get("description")
+        or article.get("title")
+    )
+
+
+def process_single_article(article: dict, topic: str, enrichment: dict) -> dict:
+    """
+    Build the stored article record from the GNews result and its enrichment
+    (summary, keywords, has_full_content).
+    """
+    return {
+        "article_id": article["url"],
+        "title": article["title"],
+        "summary": enrichment.get("summary") or article.get("description", ""),
+        "url": article["url"],
+        "source": article["source"]["name"],
+        "topic": topic,
+        "keywords": enrichment.get("keywords", []),
+        "has_full_content": enrichment.get("has_full_content", False),
+        "content_hash": compute_content_hash(article),
+    }
+
+
+def process_single_headline(article: dict, category: str, enrichment: dict) -> dict:
+    """
+    Build the stored headline record from the GNews result and its enrichment
+    (summary, keywords, has_full_content).
+    """
+    return {
+        "article_id": article["url"],
+        "title": article["title"],
+        "summary": enrichment.get("summary") or article.get("description", ""),
+        "url": article["url"],
+        "source": article["source"]["name"],
+        "topic": f"headlines_{category}",
+        "category": category,
+        "keywords": enrichment.get("keywords", []),
+        "has_full_content": enrichment.get("has_full_content", False),
+        "content_hash": compute_content_hash(article),
+        "published_at": article.get("publishedAt", ""),
+        "image": article.get("image", ""),
+    }
+
+
+async def enrich_articles(raw_articles: List[dict], sentences: int):
+    """
+    Resolve enrichment for raw GNews articles.
+    Returns ({url: enrichment}, set of URLs that were newly processed).
+    """
+    # Skip fetch + NLP for URLs that were already enriched (one batch query)
+    try:
+        enriched = await get_enriched_articles(raw_articles)
+    except Exception as e:
+        print(f"Enrichment lookup failed: {e}")
+        enriched = {}
+
+    new_articles = [a for a in raw_articles if a.get("url") not in enriched]
+    print(f"♻️ Reusing {len(enriched)} enriched articles, processing {len(new_articles)} new")
+
+    # Download every page once, concurrently, under a total deadline
+    contents = await fetch_full_articles([a.get("url") for a in new_articles])
+
+    # 🚀 SUMMARIZE + EXTRACT KEYWORDS FOR ALL NEW ARTICLES ON THE NLP POOL
+    raw_texts = [get_raw_text(a, contents.get(a.get("url"))) for a in new_articles]
+    nlp_results = await summarize_and_extract(raw_texts, sentences=sentences)
+
+    for article, (summary, keywords) in zip(new_articles, nlp_results):
+        enriched[article["url"]] = {
+            "summary": summary,
+            "keywords": keywords,
+            "has_full_content": bool(contents.get(article["url"])),
+        }
+
+    return enriched, {a["url"] for a in new_articles}
+
+
+async def _save_new_articles(articles_output: List[dict], new_urls: set):
+    # Save newly enriched articles in one bulk write (off the critical path by default)
+    new_articles = [a for a in articles_output if a["article_id"] in new_urls]
+    await save_articles_bulk(new_articles, background=settings.ARTICLE_SAVE_IN_BACKGROUND)
+
+
+async def build_topic_payload(topic: str) -> Dict:
+    """Fetch a topic from GNews, enrich every article and return the cacheable payload"""
+    # -------------------- Fetch from GNews API --------------------
+    try:
+        # Ingestion always pulls fresh results (and refreshes the shared query cache)
+        data = await gnews_client.search(topic, country="in", max_results=20, refresh=True)
+    except GNewsError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch news from GNews API: {str(e)}")
+
+    if "articles" not in data or not data["articles"]:
+        raise HTTPException(status_code=404, detail="No articles found for this topic")
+
+    enriched, new_urls = await enrich_articles(data["articles"], sentences=10)
+
+    articles_output = [
+        process_single_article(article, topic, enriched[article["url"]])
+        for article in data["articles"]
+    ]
+
+    await _save_new_articles(articles_output, new_urls)
+
+    return {"topic": topic, "articles": articles_output}
+
+
+async def build_headlines_payload(category: str) -> Dict:
+    """Fetch top headlines for a category, enrich every article and return the cacheable payload"""
+    # -------------------- Fetch from GNews Top Headlines API --------------------
+    print(f"🌐 Fetching headlines from GNews API: category={category}")
+
+    try:
+        data = await gnews_client.top_headlines(category=category, country="us", max_results=10, refresh=True)
+
+        print(f"📊 GNews returned {len(data.get('articles', []))} headlines for category '{category}'")
+
+    except GNewsError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch headlines from GNews API: {str(e)}"
+        )
+
+    if "articles" not in data or not data["articles"]:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No headlines found for category '{category}'"
+        )
+
+    enriched, new_urls = await enrich_articles(data["articles"], sentences=8)
+
+    articles_output = [
+        process_single_headline(article, category, enriched[article["url"]])
+        for article in data["articles"]
+    ]
+
+    print(f"✨ Processed {len(articles_output)} headlines successfully")
+
+    await _save_new_articles(articles_output, new_urls)
+
+    return {
+        "category": category,
+        "articles": articles_output
+    }
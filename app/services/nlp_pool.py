@@ -0,0 +1,109 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+from app.core.config import settings
+import multiprocessing
+import asyncio
+import math
+import os
+
+# App-lifetime process pool for CPU-bound NLP (TextRank + RAKE)
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+# -------------------- Worker side --------------------
+def _init_worker():
+    """Runs once per worker process: load NLTK data, RAKE and sumy up front"""
+    from app.services.keyword_extractor import extract_keywords
+    from app.services.text_summarizer import summarize_text
+
+    # Warm up so the first real batch doesn't pay model / corpus loading
+    sample = "Warm up sentence for the summarizer. " * 20
+    extract_keywords(sample)
+    summarize_text(sample)
+
+
+def _process_batch(texts: List[Optional[str]], sentences: int) -> List[Tuple[Optional[str], List[str]]]:
+    """Summarize + extract keywords for a batch of texts (runs inside a worker)"""
+    from app.services.keyword_extractor import extract_keywords
+    from app.services.text_summarizer import summarize_text
+
+    return [
+        (summarize_text(text, sentences=sentences), extract_keywords(text))
+        for text in texts
+    ]
+
+
+# -------------------- App side --------------------
+def get_worker_count() -> int:
+    return settings.NLP_WORKERS or os.cpu_count() or 1
+
+
+def _new_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=get_worker_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+def start_nlp_pool():
+    global _executor
+    if _executor is None:
+        _executor = _new_executor()
+        print(f"[+] NLP process pool started ({get_worker_count()} workers)")
+
+
+def _replace_broken_pool(broken: ProcessPoolExecutor):
+    """
+    Swap in a fresh pool without blocking the event loop. Only the first request that
+    sees a given pool break replaces it; the broken one is released in the background.
+    """
+    global _executor
+    if _executor is not broken:
+        return
+    _executor = _new_executor()
+    broken.shutdown(wait=False)
+    print("[+] NLP process pool replaced")
+
+
+def shutdown_nlp_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        print("[-] NLP process pool stopped")
+
+
+async def summarize_and_extract(
+    texts: List[Optional[str]],
+    sentences: int = 8,
+) -> List[Tuple[Optional[str], List[str]]]:
+    """
+    Summarize and extract keywords for many texts at once.
+    The batch is split into one chunk per worker; results keep input order.
+    """
+    if not texts:
+        return []
+
+    if _executor is None:
+        # Pool not started (scripts, shells) - run inline off the event loop
+        return await asyncio.to_thread(_process_batch, texts, sentences)
+
+    executor = _executor
+    loop = asyncio.get_running_loop()
+    chunk_size = math.ceil(len(texts) / get_worker_count())
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+    try:
+        results = await asyncio.gather(*[
+            loop.run_in_executor(executor, _process_batch, chunk, sentences)
+            for chunk in chunks
+        ])
+    except BrokenProcessPool as e:
+        # A worker died - replace the pool and serve this batch inline
+        print(f"NLP pool broken ({e}), restarting pool")
+        _replace_broken_pool(executor)
+        return await asyncio.to_thread(_process_batch, texts, sentences)
+
+    return [item for chunk in results for item in chunk]
@@ -0,0 +1,135 @@
+from app.core.config import settings
+from app.database.mongodb import get_database
+from app.services.collab_engine import set_collab_user
+from app.utils.profile_keys import decode_weights, encode_key
+from typing import Dict, Iterable, Optional
+import asyncio
+import heapq
+import time
+
+# Weights that decayed below this are dropped at compaction
+MIN_WEIGHT = 0.05
+
+# Compactions scheduled by this worker (kept referenced until done)
+_compactions: Dict[str, asyncio.Task] = {}
+
+
+def get_profiles_collection():
+    return get_database()["profiles"]
+
+
+def decay_factor(decayed_at: Optional[float], now: float) -> float:
+    """Multiplier for weights last decayed at `decayed_at` (half-life PROFILE_DECAY_HALF_LIFE_DAYS)"""
+    half_life = settings.PROFILE_DECAY_HALF_LIFE_DAYS * 86400
+    if not half_life or not decayed_at or now <= decayed_at:
+        return 1.0
+    return 0.5 ** ((now - decayed_at) / half_life)
+
+
+def prune_weights(weights: Dict[str, float], limit: int, factor: float = 1.0) -> Dict[str, float]:
+    """Decayed weights, keeping the `limit` strongest (by magnitude, so dislikes survive too)"""
+    decayed = ((key, weight * factor) for key, weight in weights.items())
+    kept = [(key, weight) for key, weight in decayed if abs(weight) >= MIN_WEIGHT]
+    if len(kept) > limit:
+        kept = heapq.nlargest(limit, kept, key=lambda item: abs(item[1]))
+    return {key: round(weight, 4) for key, weight in kept}
+
+
+def compaction_due(profile: dict, now: float) -> bool:
+    """Profiles are rewritten once they have collected enough new keys or their decay is stale"""
+    decayed_at = profile.get("decayed_at")
+    if not decayed_at:
+        return True
+    if profile.get("pending_keys", 0) > settings.PROFILE_COMPACT_SLACK_KEYS:
+        return True
+    return now - decayed_at >= settings.PROFILE_COMPACT_INTERVAL_SECONDS
+
+
+def decay_profile(profile: Optional[dict], now: Optional[float] = None) -> Optional[dict]:
+    """
+    Read-time view of a decoded profile: weights decayed to `now` and pruned to the
+    top-K, so callers never see more than PROFILE_MAX_TOPICS/KEYWORDS entries even
+    before the stored document has been compacted. Schedules the compaction if due.
+    """
+    if profile is None:
+        return None
+    now = now or time.time()
+
+    factor = decay_factor(profile.get("decayed_at"), now)
+    profile["topics"] = prune_weights(profile.get("topics") or {}, settings.PROFILE_MAX_TOPICS, factor)
+    profile["keywords"] = prune_weights(profile.get("keywords") or {}, settings.PROFILE_MAX_KEYWORDS, factor)
+
+    if profile.get("user_id") and compaction_due(profile, now):
+        schedule_compaction([profile["user_id"]])
+    return profile
+
+
+async def compact_profile(user_id: str) -> bool:
+    """
+    Rewrite one stored profile with decayed, pruned weights.
+    Guarded by the profile's version, so an interaction landing between the read
+    and the write makes this a no-op instead of losing its $inc (retried next time).
+    """
+    profiles = get_profiles_collection()
+    doc = await profiles.find_one({"user_id": user_id}, {"_id": 0})
+    if doc is None:
+        return False
+
+    now = time.time()
+    factor = decay_factor(doc.get("decayed_at"), now)
+    keywords = prune_weights(decode_weights(doc.get("keywords")), settings.PROFILE_MAX_KEYWORDS, factor)
+    topics = prune_weights(decode_weights(doc.get("topics")), settings.PROFILE_MAX_TOPICS, factor)
+
+    result = await profiles.update_one(
+        {"user_id": user_id, "version": doc.get("version")},
+        {
+            "$set": {
+                "topics": {encode_key(k): v for k, v in topics.items()},
+                "keywords": {encode_key(k): v for k, v in keywords.items()},
+                "decayed_at": now,
+                "pending_keys": 0,
+            },
+            "$inc": {"version": 1},
+        },
+    )
+    if not result.modified_count:
+        return False
+
+    set_collab_user(user_id, keywords)
+    return True
+
+
+async def _compact(user_id: str):
+    try:
+        await compact_profile(user_id)
+    except Exception as e:
+        print(f"Profile compaction failed for {user_id}: {e}")
+    finally:
+        _compactions.pop(user_id, None)
+
+
+def schedule_compaction(user_ids: Iterable[str]):
+    """Compact in the background (at most one pending compaction per user per worker)"""
+    for user_id in user_ids:
+        if user_id not in _compactions:
+            _compactions[user_id] = asyncio.create_task(_compact(user_id))
+
+
+async def compact_if_due(user_ids: Iterable[str]):
+    """After a bulk write: one query finds which of the written profiles need compaction"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    now = time.time()
+    cursor = get_profiles_collection().find(
+        {
+            "user_id": {"$in": user_ids},
+            "$or": [
+                {"decayed_at": {"$exists": False}},
+                {"decayed_at": {"$lt": now - settings.PROFILE_COMPACT_INTERVAL_SECONDS}},
+                {"pending_keys": {"$gt": settings.PROFILE_COMPACT_SLACK_KEYS}},
+            ],
+        },
+        {"_id": 0, "user_id": 1},
+    )
+    schedule_compaction([doc["user_id"] async for doc in cursor])
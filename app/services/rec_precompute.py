@@ -0,0 +1,204 @@
+from app.core.config import settings
+from app.database.redis_client import pipeline_ops
+from app.services.cache_service import acquire_lock, release_lock
+from app.services import gnews_client
+from app.services.gnews_client import GNewsError
+from app.services.article_index import get_article_index
+from app.api.v1.models.interaction_model import get_interactions_collection, get_profiles_collection
+from app.api.v1.models.item_model import item_recommend_articles
+from app.api.v1.models.hybrid_model import (
+    blend_recommendations, compute_group_content_scores, top_topics, ranking_ops, ranking_keys,
+)
+from app.services.profile_compaction import decay_profile
+from app.utils.profile_keys import decode_profile
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import asyncio
+import time
+
+LOCK_NAME = "rec_precompute"
+
+# Rankings are written to Redis in pipelined chunks of this many users
+WRITE_BATCH_SIZE = 200
+
+# Users of one top-topic group scored together (one matrix product per batch)
+GROUP_BATCH_SIZE = 64
+
+# Background task handle (one per worker process)
+_task: Optional[asyncio.Task] = None
+
+
+async def get_active_users(window_seconds: int, limit: int) -> List[str]:
+    """Users with interactions inside the window, most active first"""
+    since = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=window_seconds))
+    pipeline = [
+        {"$match": {"_id": {"$gte": since}}},
+        {"$group": {"_id": "$user_id", "interactions": {"$sum": 1}}},
+        {"$sort": {"interactions": -1}},
+        {"$limit": limit},
+    ]
+    docs = await get_interactions_collection().aggregate(pipeline).to_list(length=limit)
+    return [doc["_id"] for doc in docs if doc["_id"]]
+
+
+async def _fetch_topic_articles(topics: List[str]) -> Dict[str, dict]:
+    """One GNews search per distinct topic, shared by every user who needs it"""
+    async def _search(topic):
+        try:
+            return topic, await gnews_client.search(topic, country="in", max_results=10)
+        except GNewsError as e:
+            print(f"GNews search failed for '{topic}': {e}")
+            return topic, None
+
+    results = await asyncio.gather(*[_search(topic) for topic in topics])
+    return {topic: response for topic, response in results if response is not None}
+
+
+async def precompute_recommendations(user_ids: Optional[List[str]] = None) -> dict:
+    """
+    Materialize the cached hybrid ranking (hybrid_rank:{user_id}) for active users.
+    Users are grouped by top topic: GNews candidates are fetched once per topic and each
+    group's content scoring is batched (one matrix product off the event loop for the
+    vector ranking). PRECOMPUTE_CONCURRENCY coroutines work through the groups, and
+    rankings are written in pipelined
+    batches of WRITE_BATCH_SIZE users. A ranking whose profile changed while it was
+    computed is discarded, so it can't outlive that interaction's cache invalidation.
+    """
+    started = time.perf_counter()
+    if user_ids is None:
+        user_ids = await get_active_users(settings.PRECOMPUTE_ACTIVE_WINDOW_SECONDS, settings.PRECOMPUTE_MAX_USERS)
+
+    profiles = {}
+    if user_ids:
+        cursor = get_profiles_collection().find({"user_id": {"$in": user_ids}}, {"_id": 0})
+        loaded = [decay_profile(decode_profile(doc)) async for doc in cursor]
+        # Filter after decay: topics that netted out or faded below MIN_WEIGHT are pruned
+        profiles = {profile["user_id"]: profile for profile in loaded if profile["topics"]}
+
+    groups: Dict[str, List[str]] = {}
+    needed_topics = set()
+    for user_id, profile in list(profiles.items()):
+        topics = [topic for topic, _ in top_topics(profile, settings.CONTENT_TOPIC_FANOUT)]
+        if not topics:
+            del profiles[user_id]
+            continue
+        groups.setdefault(topics[0], []).append(user_id)
+        needed_topics.update(topics)
+
+    # Without a usable local index every user falls back to GNews - fetch each topic once
+    index = get_article_index()
+    topic_articles = {}
+    if index is None or not len(index):
+        topic_articles = await _fetch_topic_articles(sorted(needed_topics))
+
+    # Large groups are split so one popular topic doesn't serialize the run
+    queue: asyncio.Queue = asyncio.Queue()
+    for members in groups.values():
+        for start in range(0, len(members), GROUP_BATCH_SIZE):
+            queue.put_nowait(members[start:start + GROUP_BATCH_SIZE])
+
+    pending: Dict[str, list] = {}
+    stats = {"users": len(profiles), "written": 0, "stale": 0, "empty": 0, "failed": 0}
+
+    async def _flush():
+        if pending:
+            batch = dict(pending)
+            pending.clear()
+            await pipeline_ops([op for ops in batch.values() for op in ops])
+
+            # Checked after the write: an interaction that bumped the version before this read
+            # may have invalidated before the write landed, so its stale ranking is removed here.
+            # One that bumps it later invalidates after the write, as usual.
+            cursor = get_profiles_collection().find({"user_id": {"$in": list(batch)}}, {"_id": 0, "user_id": 1, "version": 1})
+            current = {doc["user_id"]: doc.get("version") async for doc in cursor}
+            stale = [user_id for user_id in batch if current.get(user_id) != profiles[user_id].get("version")]
+            if stale:
+                await pipeline_ops([("delete", *ranking_keys(user_id)) for user_id in stale])
+
+            stats["written"] += len(batch) - len(stale)
+            stats["stale"] += len(stale)
+
+    async def _worker():
+        while True:
+            try:
+                members = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                content = await compute_group_content_scores({user_id: profiles[user_id] for user_id in members}, topic_articles)
+            except Exception as e:
+                print(f"Precompute failed for a group of {len(members)} users: {e}")
+                stats["failed"] += len(members)
+                continue
+
+            for user_id in members:
+                try:
+                    recommendations = blend_recommendations(content[user_id], await item_recommend_articles(user_id))
+                except Exception as e:
+                    print(f"Precompute failed for {user_id}: {e}")
+                    stats["failed"] += 1
+                    continue
+
+                if not recommendations:
+                    stats["empty"] += 1
+                    continue
+
+                pending[user_id] = ranking_ops(user_id, recommendations)
+                if len(pending) >= WRITE_BATCH_SIZE:
+                    await _flush()
+
+    workers = max(1, settings.PRECOMPUTE_CONCURRENCY)
+    await asyncio.gather(*[_worker() for _ in range(workers)])
+    await _flush()
+
+    elapsed = time.perf_counter() - started
+    stats["topics"] = len(groups)
+    stats["seconds"] = round(elapsed, 3)
+    stats["users_per_sec"] = round(stats["users"] / elapsed, 1) if elapsed else 0.0
+    print(
+        f"📦 Precomputed recommendations: {stats['written']}/{stats['users']} users, "
+        f"{stats['topics']} topics in {elapsed:.2f}s ({stats['users_per_sec']} users/sec)"
+    )
+    return stats
+
+
+async def run_precompute_cycle(user_ids: Optional[List[str]] = None) -> Optional[dict]:
+    """One precompute run by whichever worker holds the lock (None if another run is active)"""
+    token = await acquire_lock(LOCK_NAME, lease_seconds=max(settings.PRECOMPUTE_INTERVAL_SECONDS, 60))
+    if token is None:
+        return None
+    try:
+        return await precompute_recommendations(user_ids)
+    finally:
+        await release_lock(LOCK_NAME, token)
+
+
+async def _scheduler_loop():
+    print(f"[+] Recommendation precompute scheduler started (every {settings.PRECOMPUTE_INTERVAL_SECONDS}s)")
+    while True:
+        try:
+            await run_precompute_cycle()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Recommendation precompute error: {e}")
+        await asyncio.sleep(settings.PRECOMPUTE_INTERVAL_SECONDS)
+
+
+def start_precompute_scheduler():
+    global _task
+    if settings.PRECOMPUTE_ENABLED and _task is None:
+        _task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_precompute_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+        print("[-] Recommendation precompute scheduler stopped")
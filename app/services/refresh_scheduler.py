@@ -0,0 +1,156 @@
+from app.core.config import settings
+from app.database.redis_client import redis_client, pipeline_ops
+from app.services.cache_service import acquire_lock, release_lock, store_payload
+from app.services.news_service import (
+    build_topic_payload,
+    build_headlines_payload,
+    VALID_CATEGORIES,
+    TOPIC_HITS_KEY,
+    REQUESTED_AT_KEY,
+)
+from datetime import datetime, timezone
+from typing import List, Tuple, Callable, Optional
+import asyncio
+import time
+
+# Set (NX + TTL) by whichever worker decays the topic hits, once per TOPIC_HITS_DECAY_SECONDS
+HITS_DECAY_MARKER = "refresh:hits_decayed"
+
+# Background task handle (one per worker process)
+_task: Optional[asyncio.Task] = None
+
+
+def _budget_key() -> str:
+    return f"refresh:quota:{datetime.now(timezone.utc):%Y%m%d}"
+
+
+async def claim_refresh_budget() -> bool:
+    """
+    Count one GNews call against the refresh share of the daily quota (across workers).
+    False once background refreshes have used their share for today.
+    """
+    if settings.GNEWS_DAILY_QUOTA <= 0:
+        return True
+
+    budget_key = _budget_key()
+    used = await redis_client.incr(budget_key)
+    if used == 1:
+        await redis_client.expire(budget_key, 2 * 24 * 3600)
+    return used <= int(settings.GNEWS_DAILY_QUOTA * settings.REFRESH_QUOTA_SHARE)
+
+
+async def decay_topic_hits():
+    """Halve every topic's hit count, drop faded topics and keep only the top TOPIC_HITS_MAX"""
+    if not await redis_client.set(HITS_DECAY_MARKER, int(time.time()), nx=True, ex=settings.TOPIC_HITS_DECAY_SECONDS):
+        return
+
+    await pipeline_ops([
+        ("zunionstore", TOPIC_HITS_KEY, {TOPIC_HITS_KEY: 0.5}),
+        ("zremrangebyscore", TOPIC_HITS_KEY, "-inf", "(0.5"),
+        ("zremrangebyrank", TOPIC_HITS_KEY, 0, -(settings.TOPIC_HITS_MAX + 1)),
+        ("zremrangebyscore", REQUESTED_AT_KEY, "-inf", time.time() - settings.REFRESH_IDLE_SECONDS),
+    ])
+
+
+async def get_refresh_targets() -> List[Tuple[str, int, Callable, str]]:
+    """(cache_key, ttl, builder, arg) for every cache entry we keep warm"""
+    targets = [
+        (f"headlines:{category}", settings.HEADLINES_CACHE_TTL, build_headlines_payload, category)
+        for category in VALID_CATEGORIES
+    ]
+
+    # Configured topics first, then the most requested ones
+    topics = list(settings.REFRESH_TOPICS)
+    if settings.REFRESH_TOP_TOPICS > 0:
+        popular = await redis_client.zrevrange(TOPIC_HITS_KEY, 0, settings.REFRESH_TOP_TOPICS - 1)
+        topics += [t for t in popular if t not in topics]
+
+    targets += [
+        (f"news:{topic}", settings.NEWS_CACHE_TTL, build_topic_payload, topic)
+        for topic in topics
+    ]
+
+    # Only entries someone asked for recently - idle ones are left to expire
+    if not targets:
+        return []
+    requested_at = await redis_client.zmscore(REQUESTED_AT_KEY, [key for key, *_ in targets])
+    cutoff = time.time() - settings.REFRESH_IDLE_SECONDS
+    return [
+        target for target, last in zip(targets, requested_at)
+        if last is not None and last >= cutoff
+    ]
+
+
+async def refresh_entry(cache_key: str, ttl: int, builder: Callable, arg: str) -> bool:
+    """Rebuild one cache entry if it is about to expire. Returns True if refreshed."""
+    remaining = await redis_client.ttl(cache_key)
+
+    # -2 = missing (the next request builds it), -1 = no expiry set (leave it alone),
+    # otherwise refresh only inside the lead window
+    if remaining < 0 or remaining > settings.REFRESH_LEAD_SECONDS:
+        return False
+
+    # Same lock as request-side builds, so a refresh never races a cache-miss build
+    token = await acquire_lock(cache_key)
+    if token is None:
+        return False
+
+    started = time.perf_counter()
+    try:
+        if not await claim_refresh_budget():
+            print(f"Refresh budget for today used up - leaving {cache_key} to expire")
+            return False
+
+        payload = await builder(arg)
+        # SETEX replaces the old value atomically - readers never see a gap
+        await store_payload(cache_key, ttl, payload)
+        print(f"🔄 Refreshed {cache_key} in {time.perf_counter() - started:.1f}s")
+        return True
+    except Exception as e:
+        print(f"Refresh failed for {cache_key}: {e}")
+        return False
+    finally:
+        await release_lock(cache_key, token)
+
+
+async def run_refresh_cycle() -> int:
+    await decay_topic_hits()
+    targets = await get_refresh_targets()
+    semaphore = asyncio.Semaphore(settings.REFRESH_CONCURRENCY)
+
+    async def _guarded(target):
+        async with semaphore:
+            return await refresh_entry(*target)
+
+    results = await asyncio.gather(*[_guarded(t) for t in targets])
+    return sum(1 for r in results if r)
+
+
+async def _scheduler_loop():
+    print(f"[+] Refresh-ahead scheduler started (every {settings.REFRESH_INTERVAL_SECONDS}s)")
+    while True:
+        try:
+            await run_refresh_cycle()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Refresh cycle error: {e}")
+        await asyncio.sleep(settings.REFRESH_INTERVAL_SECONDS)
+
+
+def start_refresh_scheduler():
+    global _task
+    if settings.REFRESH_AHEAD_ENABLED and _task is None:
+        _task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_refresh_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+        print("[-] Refresh-ahead scheduler stopped")
@@ -0,0 +1,41 @@
+from sumy.parsers.plaintext import PlaintextParser
+from sumy.nlp.tokenizers import Tokenizer
+from sumy.summarizers.text_rank import TextRankSummarizer
+from typing import Optional
+
+# Built once per process (each NLP pool worker gets its own copy)
+_tokenizer = None
+_summarizer = None
+
+
+def _get_tools():
+    global _tokenizer, _summarizer
+    if _tokenizer is None:
+        _tokenizer = Tokenizer("english")
+        _summarizer = TextRankSummarizer()
+    return _tokenizer, _summarizer
+
+
+def summarize_text(text: Optional[str], sentences: int = 8):
+    """Generate comprehensive summary using TextRank algorithm - full paragraph summaries"""
+    if not text or len(text.split()) < 15:
+        return text
+
+    try:
+        tokenizer, summarizer = _get_tools()
+        parser = PlaintextParser.from_string(text, tokenizer)
+
+        doc_sentences = len(parser.document.sentences)
+
+        if doc_sentences <= 5:
+            num_sentences = doc_sentences
+        else:
+            num_sentences = max(5, min(10, int(doc_sentences * 0.25)))
+
+        summary_sentences = summarizer(parser.document, num_sentences)
+        summary = " ".join([str(sentence) for sentence in summary_sentences])
+
+        return summary.strip()
+    except Exception as e:
+        print(f"Summarization error: {e}")
+        return text
@@ -0,0 +1,37 @@
+from typing import Dict, Optional
+
+# Profile topics/keywords are stored as sub-document field names, so they are
+# percent-encoded to stay valid in "$inc" paths ("." splits a path, "$" starts an operator).
+# "%" is encoded first so decoding is unambiguous.
+_ENCODE = (("%", "%25"), (".", "%2E"), ("$", "%24"))
+_DECODE = (("%2E", "."), ("%24", "$"), ("%25", "%"))
+
+PROFILE_WEIGHT_FIELDS = ("topics", "keywords")
+
+
+def encode_key(key: str) -> str:
+    for raw, encoded in _ENCODE:
+        key = key.replace(raw, encoded)
+    return key
+
+
+def decode_key(key: str) -> str:
+    if "%" not in key:
+        return key
+    for encoded, raw in _DECODE:
+        key = key.replace(encoded, raw)
+    return key
+
+
+def decode_weights(weights: Optional[Dict[str, float]]) -> Dict[str, float]:
+    return {decode_key(key): value for key, value in (weights or {}).items()}
+
+
+def decode_profile(profile: Optional[dict]) -> Optional[dict]:
+    """Profile document with its topic/keyword field names decoded back to plain text"""
+    if profile is None:
+        return None
+    for field in PROFILE_WEIGHT_FIELDS:
+        if field in profile:
+            profile[field] = decode_weights(profile[field])
+    return profile
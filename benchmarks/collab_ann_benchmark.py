@@ -0,0 +1,82 @@
+"""
+Recall / latency of the LSH user index against exact cosine.
+
+    python -m benchmarks.collab_ann_benchmark --users 20000 --queries 200
+
+Profiles are synthetic: keyword popularity is Zipfian and every user leans
+towards one of a few hundred interest clusters, which is roughly what
+interaction-built profiles look like.
+"""
+from app.services.collab_engine import CollabEngine
+from app.services.ann_index import LSHIndex
+import argparse
+import time
+import numpy as np
+
+
+def synthetic_profiles(n_users: int, n_keywords: int, n_clusters: int, per_user: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, n_keywords + 1)
+    popularity /= popularity.sum()
+    clusters = [rng.choice(n_keywords, size=40, replace=False) for _ in range(n_clusters)]
+
+    profiles = []
+    for u in range(n_users):
+        cluster = clusters[rng.integers(n_clusters)]
+        own = rng.choice(cluster, size=per_user // 2)
+        common = rng.choice(n_keywords, size=per_user - len(own), p=popularity)
+        keywords = {}
+        for kw in np.concatenate([own, common]):
+            keywords[f"kw{kw}"] = keywords.get(f"kw{kw}", 0) + float(rng.integers(1, 9))
+        profiles.append((f"user{u}", keywords))
+    return profiles
+
+
+def run(engine: CollabEngine, queries, k: int, use_ann: bool):
+    results, started = [], time.perf_counter()
+    for user_id in queries:
+        results.append(engine.top_k(user_id, k) if not use_ann else engine.top_k_for_vector(
+            engine.row_vector(engine.user_index[user_id]), k, exclude=user_id, use_ann=True
+        ))
+    return results, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--keywords", type=int, default=5000)
+    parser.add_argument("--clusters", type=int, default=300)
+    parser.add_argument("--per-user", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=50)
+    args = parser.parse_args()
+
+    profiles = synthetic_profiles(args.users, args.keywords, args.clusters, args.per_user)
+    engine = CollabEngine.from_profiles(profiles)
+    queries = [profiles[i][0] for i in np.random.default_rng(1).choice(len(profiles), args.queries, replace=False)]
+
+    exact, exact_ms = run(engine, queries, args.k, use_ann=False)
+    print(f"users={args.users} k={args.k}  exact: {exact_ms:.2f} ms/query")
+    print(f"{'tables':>6} {'bits':>4} {'probes':>6} {'build s':>8} {'ms/query':>9} {'recall@k':>9} {'candidates':>10}")
+
+    for n_tables, n_bits, n_probes in [(8, 12, 2), (8, 8, 2), (16, 8, 2), (32, 8, 2), (32, 6, 2)]:
+        started = time.perf_counter()
+        engine.ann = LSHIndex(n_tables=n_tables, n_bits=n_bits, n_probes=n_probes).build(engine.matrix)
+        build_s = time.perf_counter() - started
+
+        approx, ann_ms = run(engine, queries, args.k, use_ann=True)
+
+        recalls, candidates = [], []
+        for user_id, truth, found in zip(queries, exact, approx):
+            if truth:
+                recalls.append(len({u for u, _ in truth} & {u for u, _ in found}) / len(truth))
+            candidates.append(engine.ann.candidates(engine.row_vector(engine.user_index[user_id])).size)
+
+        print(
+            f"{n_tables:>6} {n_bits:>4} {n_probes:>6} {build_s:>8.2f} {ann_ms:>9.2f} "
+            f"{np.mean(recalls):>9.3f} {int(np.mean(candidates)):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
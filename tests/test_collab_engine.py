@@ -0,0 +1,65 @@
+import os
+import random
+
+import numpy as np
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("NEWS_API_KEY", "test")
+
+from app.services.collab_engine import CollabEngine  # noqa: E402
+
+
+def _cosine(a, b):
+    dot = sum(w * b.get(k, 0.0) for k, w in a.items())
+    na = np.sqrt(sum(w * w for w in a.values()))
+    nb = np.sqrt(sum(w * w for w in b.values()))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+def test_apply_delta_matches_exact_cosine():
+    for seed in range(5):
+        rng = random.Random(seed)
+        keywords = [f"k{i}" for i in range(40)]
+        users = [f"u{i}" for i in range(80)]
+        truth = {u: {rng.choice(keywords): float(rng.randint(1, 5))} for u in users}
+
+        engine = CollabEngine.from_profiles([(u, dict(kw)) for u, kw in truth.items()], neighbor_k=10)
+        for _ in range(400):
+            user = rng.choice(users)
+            # Repeats of the same keyword only rescale the row - the norm must still follow
+            deltas = {rng.choice(keywords[:5] if rng.random() < 0.5 else keywords): float(rng.choice([1, 2, 5, -5]))}
+            for kw, delta in deltas.items():
+                truth[user][kw] = truth[user].get(kw, 0.0) + delta
+                if abs(truth[user][kw]) < 1e-6:
+                    del truth[user][kw]
+            engine.apply_delta(user, deltas)
+
+        for user in users:
+            row = engine.user_index[user]
+            assert np.isclose(engine.norms[row], np.sqrt(sum(w * w for w in truth[user].values())), rtol=1e-4)
+
+            for other, sim in engine.top_k(user, 10):
+                assert abs(sim - _cosine(truth[user], truth[other])) < 1e-4, (seed, user, other)
+
+
+def test_top_k_all_scores_overlay_rows():
+    rng = random.Random(7)
+    keywords = [f"k{i}" for i in range(20)]
+    users = [f"u{i}" for i in range(30)]
+    truth = {u: {rng.choice(keywords): float(rng.randint(1, 5))} for u in users}
+
+    engine = CollabEngine.from_profiles([(u, dict(kw)) for u, kw in truth.items()], neighbor_k=10)
+    for _ in range(60):
+        user = rng.choice(users + ["late"])
+        kw = rng.choice(keywords + ["new_kw"])
+        truth.setdefault(user, {})[kw] = truth.get(user, {}).get(kw, 0.0) + 2.0
+        engine.apply_delta(user, {kw: 2.0})
+
+    neighbors = engine.top_k_all(k=len(truth))
+    for user in truth:
+        expected = {o: _cosine(truth[user], truth[o]) for o in truth if o != user}
+        expected = {o: sim for o, sim in expected.items() if sim > 1e-6}
+        got = dict(neighbors[user])
+        assert set(got) == set(expected), user
+        for other, sim in got.items():
+            assert abs(sim - expected[other]) < 1e-4, (user, other)